@@ -0,0 +1,20 @@
+"""
+Project JSON encoder for Inertia responses.
+"""
+
+from types import MappingProxyType
+
+from inertia.utils import InertiaJsonEncoder
+
+
+class AppJSONEncoder(InertiaJsonEncoder):
+    """
+    InertiaJsonEncoder plus read-only mapping support, so frozen shared
+    structures (e.g. the schema preset catalog) serialize without the
+    views making per-request copies.
+    """
+
+    def default(self, o):
+        if isinstance(o, MappingProxyType):
+            return dict(o)
+        return super().default(o)
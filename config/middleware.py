@@ -0,0 +1,25 @@
+"""
+Custom middleware for the project.
+"""
+
+from inertia.middleware import InertiaMiddleware
+
+
+class PathScopedInertiaMiddleware:
+    """
+    Run InertiaMiddleware only for paths Inertia actually serves.
+
+    Admin (and static/media) requests never render Inertia pages, so the
+    per-request Inertia response handling is pure overhead there.
+    """
+
+    SKIP_PREFIXES = ("/admin/", "/static/", "/media/")
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.inertia = InertiaMiddleware(get_response)
+
+    def __call__(self, request):
+        if request.path.startswith(self.SKIP_PREFIXES):
+            return self.get_response(request)
+        return self.inertia(request)
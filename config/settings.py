@@ -6,6 +6,14 @@ load_dotenv()
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# Database connection settings — read once, shared between DATABASES and
+# the Celery broker URL below.
+DB_NAME = os.environ.get("DB_NAME", "parser_db")
+DB_USER = os.environ.get("DB_USER", "postgres")
+DB_PASSWORD = os.environ.get("DB_PASSWORD", "postgres")
+DB_HOST = os.environ.get("DB_HOST", "localhost")
+DB_PORT = os.environ.get("DB_PORT", "5432")
+
 SECRET_KEY = os.environ.get("DJANGO_SECRET_KEY", "change-me-in-production")
 DEBUG = os.environ.get("DJANGO_DEBUG", "True").lower() in ("true", "1", "yes")
 ALLOWED_HOSTS = os.environ.get("DJANGO_ALLOWED_HOSTS", "localhost,127.0.0.1").split(",")
@@ -33,7 +41,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
-    "inertia.middleware.InertiaMiddleware",
+    "config.middleware.PathScopedInertiaMiddleware",
 ]
 
 ROOT_URLCONF = "config.urls"
@@ -60,16 +68,36 @@ WSGI_APPLICATION = "config.wsgi.application"
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.postgresql",
-        "NAME": os.environ.get("DB_NAME", "parser_db"),
-        "USER": os.environ.get("DB_USER", "postgres"),
-        "PASSWORD": os.environ.get("DB_PASSWORD", "postgres"),
-        "HOST": os.environ.get("DB_HOST", "localhost"),
-        "PORT": os.environ.get("DB_PORT", "5432"),
+        "NAME": DB_NAME,
+        "USER": DB_USER,
+        "PASSWORD": DB_PASSWORD,
+        "HOST": DB_HOST,
+        "PORT": DB_PORT,
+        # Reuse connections across requests instead of paying the
+        # TCP + auth handshake every time.
+        "CONN_MAX_AGE": 600,
+        "CONN_HEALTH_CHECKS": True,
     }
 }
 
 AUTH_PASSWORD_VALIDATORS = []
 
+# Cache — Redis when configured, per-process LocMem otherwise.
+_redis_url = os.environ.get("REDIS_URL", "")
+if _redis_url:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": _redis_url,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
 # CSRF Settings
 CSRF_TRUSTED_ORIGINS = ["http://localhost:8000", "http://127.0.0.1:8000"]
 CSRF_COOKIE_HTTPONLY = False  # Allow JavaScript to read the cookie
@@ -91,8 +119,11 @@ MEDIA_ROOT = BASE_DIR / "media"
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 # --- Inertia ---
+from config.encoders import AppJSONEncoder  # noqa: E402
+
 INERTIA_LAYOUT = "base.html"
 INERTIA_SSR_ENABLED = False
+INERTIA_JSON_ENCODER = AppJSONEncoder
 
 # --- Django Vite ---
 DJANGO_VITE = {
@@ -106,12 +137,17 @@ DJANGO_VITE = {
 }
 
 # --- Celery (PostgreSQL broker via SQLAlchemy) ---
-_db_user = os.environ.get("DB_USER", "postgres")
-_db_pass = os.environ.get("DB_PASSWORD", "postgres")
-_db_host = os.environ.get("DB_HOST", "localhost")
-_db_port = os.environ.get("DB_PORT", "5432")
-_db_name = os.environ.get("DB_NAME", "parser_db")
-CELERY_BROKER_URL = f"sqla+postgresql://{_db_user}:{_db_pass}@{_db_host}:{_db_port}/{_db_name}"
+# The +psycopg suffix selects SQLAlchemy's psycopg 3 dialect — the bare
+# postgresql:// dialect insists on psycopg2, which is no longer installed.
+CELERY_BROKER_URL = (
+    f"sqla+postgresql+psycopg://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+)
+# The SQLAlchemy transport polls the queue table; tighten the interval so
+# dispatch latency stays sub-second without hammering Postgres.
+CELERY_BROKER_TRANSPORT_OPTIONS = {"polling_interval": 0.5}
+# Cap broker connections per worker so the Postgres-backed broker isn't
+# flooded with short-lived connections.
+CELERY_BROKER_POOL_LIMIT = 10
 CELERY_RESULT_BACKEND = "django-db"
 CELERY_ACCEPT_CONTENT = ["json"]
 CELERY_TASK_SERIALIZER = "json"
@@ -121,6 +157,11 @@ CELERY_TASK_TRACK_STARTED = True
 CELERY_TASK_TIME_LIMIT = 600  # 10 minutes
 CELERY_BROKER_CONNECTION_RETRY_ON_STARTUP = True
 
+# --- Document processing ---
+# Concurrent LLM chunk requests per document — caps parallel extraction
+# so bursts stay inside provider rate limits.
+MAX_CONCURRENT_CHUNKS = int(os.environ.get("MAX_CONCURRENT_CHUNKS", "5"))
+
 # --- LLM API Keys ---
 OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY", "")
 OPENAI_BASE_URL = os.environ.get("OPENAI_BASE_URL", "")
@@ -129,4 +170,9 @@ GOOGLE_API_KEY = os.environ.get("GOOGLE_API_KEY", "")
 
 # --- File upload ---
 DATA_UPLOAD_MAX_MEMORY_SIZE = 50 * 1024 * 1024  # 50 MB
-FILE_UPLOAD_MAX_MEMORY_SIZE = 50 * 1024 * 1024
+# Stream uploads to temp files on disk instead of buffering up to 50 MB
+# per upload (times gunicorn worker count) in RAM.
+FILE_UPLOAD_MAX_MEMORY_SIZE = 2 * 1024 * 1024
+FILE_UPLOAD_HANDLERS = [
+    "django.core.files.uploadhandler.TemporaryFileUploadHandler",
+]
@@ -6,17 +6,29 @@ from .models import ExtractionSchema, Document, ProcessingJob, SchemaSuggestion
 class ExtractionSchemaAdmin(admin.ModelAdmin):
     list_display = ("name", "llm_provider", "llm_model", "field_count", "created_at")
     list_filter = ("llm_provider",)
+    show_full_result_count = False
     search_fields = ("name", "description")
     readonly_fields = ("created_at", "updated_at")
 
+    def get_queryset(self, request):
+        # field_count is now a stored column — no need to pull the full
+        # schema_definition JSON just to render the changelist.
+        return super().get_queryset(request).defer("schema_definition")
+
 
 @admin.register(Document)
 class DocumentAdmin(admin.ModelAdmin):
     list_display = ("title", "file_type", "created_at")
     list_filter = ("file_type",)
+    show_full_result_count = False
     search_fields = ("title",)
     readonly_fields = ("created_at",)
 
+    def get_queryset(self, request):
+        # raw_text can hold megabytes of extracted text and is never shown
+        # in the changelist — keep it out of the SELECT.
+        return super().get_queryset(request).defer("raw_text")
+
 
 @admin.register(ProcessingJob)
 class ProcessingJobAdmin(admin.ModelAdmin):
@@ -30,9 +42,28 @@ class ProcessingJobAdmin(admin.ModelAdmin):
         "completed_at",
     )
     list_filter = ("status", "schema")
+    list_select_related = ("document", "schema")
+    show_full_result_count = False
+    list_per_page = 50
     search_fields = ("document__title", "schema__name")
     readonly_fields = ("created_at", "updated_at", "completed_at")
 
+    def get_queryset(self, request):
+        # Limit the changelist SELECT to the columns actually rendered.
+        return (
+            super()
+            .get_queryset(request)
+            .only(
+                "id",
+                "status",
+                "retry_count",
+                "created_at",
+                "completed_at",
+                "document__title",
+                "schema__name",
+            )
+        )
+
 
 @admin.register(SchemaSuggestion)
 class SchemaSuggestionAdmin(admin.ModelAdmin):
@@ -47,5 +78,23 @@ class SchemaSuggestionAdmin(admin.ModelAdmin):
         "completed_at",
     )
     list_filter = ("status", "llm_provider")
+    list_select_related = ("document",)
+    show_full_result_count = False
     search_fields = ("document__title", "suggested_name")
     readonly_fields = ("created_at", "completed_at")
+
+    def get_queryset(self, request):
+        return (
+            super()
+            .get_queryset(request)
+            .only(
+                "id",
+                "status",
+                "suggested_name",
+                "llm_provider",
+                "llm_model",
+                "created_at",
+                "completed_at",
+                "document__title",
+            )
+        )
@@ -5,3 +5,24 @@ class DocumentsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "documents"
     verbose_name = "Document Processing"
+
+    def ready(self):
+        from . import signals  # noqa: F401
+
+        self._register_fast_json_codecs()
+
+    @staticmethod
+    def _register_fast_json_codecs():
+        """
+        Route JSONField (de)serialization through orjson at the psycopg
+        layer — result_data/chunk_results payloads can be large and the
+        stdlib json codec is pure CPU overhead on that path.
+        """
+        try:
+            import orjson
+            from psycopg.types.json import set_json_dumps, set_json_loads
+        except ImportError:  # pragma: no cover - psycopg2 fallback
+            return
+
+        set_json_loads(orjson.loads)
+        set_json_dumps(lambda obj: orjson.dumps(obj).decode())
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.17 on 2026-08-31 01:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0002_processingjob_chunk_results_processingjob_is_chunked_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='extractionschema',
+            name='field_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Denormalized count of top-level fields in schema_definition.'),
+        ),
+        migrations.RunSQL(
+            sql=(
+                "UPDATE documents_extractionschema "
+                "SET field_count = COALESCE(jsonb_array_length(schema_definition->'fields'), 0)"
+            ),
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.17 on 2026-08-31 01:06
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    # Concurrent index operations cannot run inside a transaction.
+    atomic = False
+
+    dependencies = [
+        ('documents', '0003_extractionschema_field_count'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='processingjob',
+            index=models.Index(fields=['status', '-created_at'], name='proc_job_status_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='processingjob',
+            index=models.Index(condition=models.Q(('status__in', ['pending', 'retrying'])), fields=['created_at'], name='proc_job_pending_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='schemasuggestion',
+            index=models.Index(fields=['status', '-created_at'], name='suggestion_status_created_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.17 on 2026-08-31 01:07
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import AddIndexConcurrently, RemoveIndexConcurrently
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    # Concurrent index operations cannot run inside a transaction.
+    atomic = False
+
+    dependencies = [
+        ('documents', '0004_processingjob_proc_job_status_created_idx_and_more'),
+    ]
+
+    operations = [
+        RemoveIndexConcurrently(
+            model_name='processingjob',
+            name='result_data_gin_idx',
+        ),
+        AddIndexConcurrently(
+            model_name='processingjob',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['result_data'], name='result_data_gin_idx', opclasses=['jsonb_path_ops']),
+        ),
+    ]
@@ -0,0 +1,25 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0005_remove_processingjob_result_data_gin_idx_and_more'),
+    ]
+
+    operations = [
+        # Keep large raw_text values out-of-line without compression so
+        # fetches that do include the column skip the decompression step.
+        # Applies to newly written values; existing rows migrate as they
+        # are rewritten.
+        migrations.RunSQL(
+            sql=(
+                "ALTER TABLE documents_document "
+                "ALTER COLUMN raw_text SET STORAGE EXTERNAL"
+            ),
+            reverse_sql=(
+                "ALTER TABLE documents_document "
+                "ALTER COLUMN raw_text SET STORAGE EXTENDED"
+            ),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.17 on 2026-08-31 01:07
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    # Concurrent index operations cannot run inside a transaction.
+    atomic = False
+
+    dependencies = [
+        ('documents', '0006_document_raw_text_storage_external'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='processingjob',
+            name='celery_task_id',
+            field=models.CharField(blank=True, default='', max_length=36),
+        ),
+        migrations.AlterField(
+            model_name='processingjob',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('completed', 'Completed'), ('failed', 'Failed'), ('retrying', 'Retrying')], db_index=True, default='pending', max_length=12),
+        ),
+        migrations.AlterField(
+            model_name='schemasuggestion',
+            name='celery_task_id',
+            field=models.CharField(blank=True, default='', max_length=36),
+        ),
+        migrations.AlterField(
+            model_name='schemasuggestion',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('completed', 'Completed'), ('failed', 'Failed')], db_index=True, default='pending', max_length=12),
+        ),
+        AddIndexConcurrently(
+            model_name='processingjob',
+            index=models.Index(condition=models.Q(('celery_task_id', ''), _negated=True), fields=['celery_task_id'], name='proc_job_task_id_idx'),
+        ),
+    ]
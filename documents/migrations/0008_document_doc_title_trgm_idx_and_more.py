@@ -0,0 +1,32 @@
+# Generated by Django 5.2.17 on 2026-08-31 01:08
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    # Concurrent index operations cannot run inside a transaction.
+    atomic = False
+
+    dependencies = [
+        ('documents', '0007_alter_processingjob_celery_task_id_and_more'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        AddIndexConcurrently(
+            model_name='document',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['title'], name='doc_title_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+        AddIndexConcurrently(
+            model_name='extractionschema',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name'], name='schema_name_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+        AddIndexConcurrently(
+            model_name='schemasuggestion',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['suggested_name'], name='suggestion_name_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+    ]
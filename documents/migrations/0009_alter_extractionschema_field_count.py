@@ -0,0 +1,27 @@
+# Generated by Django 5.2.17 on 2026-08-31 01:09
+
+import django.db.models.functions.comparison
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # The schema editor refuses to ALTER a plain column into a
+    # GeneratedField, so drop the denormalized column from 0003 and
+    # re-add it as a generated one. No backfill needed — the generated
+    # column computes itself on creation.
+
+    dependencies = [
+        ('documents', '0008_document_doc_title_trgm_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='extractionschema',
+            name='field_count',
+        ),
+        migrations.AddField(
+            model_name='extractionschema',
+            name='field_count',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.comparison.Coalesce(models.Func('schema_definition__fields', function='jsonb_array_length'), models.Value(0)), help_text='Count of top-level fields, maintained by Postgres.', output_field=models.PositiveIntegerField()),
+        ),
+    ]
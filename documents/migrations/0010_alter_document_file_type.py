@@ -0,0 +1,32 @@
+# Generated by Django 5.2.17 on 2026-08-31 01:10
+
+from django.db import migrations, models
+
+_KNOWN_TYPES = ["md", "txt", "pdf", "docx", "html", "csv", "json", "other"]
+
+
+def _remap_file_types(apps, schema_editor):
+    """
+    Fold legacy values onto the FileType choices before the column
+    narrows to varchar(8) — the old upload path stored the raw filename
+    extension (up to 20 chars), so anything outside the choice set
+    becomes "other" or the ALTER fails on over-long values.
+    """
+    Document = apps.get_model("documents", "Document")
+    Document.objects.exclude(file_type__in=_KNOWN_TYPES).update(file_type="other")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0009_alter_extractionschema_field_count'),
+    ]
+
+    operations = [
+        migrations.RunPython(_remap_file_types, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='document',
+            name='file_type',
+            field=models.CharField(choices=[('md', 'Markdown'), ('txt', 'Plain Text'), ('pdf', 'PDF'), ('docx', 'DOCX'), ('html', 'HTML'), ('csv', 'CSV'), ('json', 'JSON'), ('other', 'Other')], db_index=True, default='md', max_length=8),
+        ),
+    ]
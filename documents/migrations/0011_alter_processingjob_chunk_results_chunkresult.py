@@ -0,0 +1,33 @@
+# Generated by Django 5.2.17 on 2026-08-31 01:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0010_alter_document_file_type'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='processingjob',
+            name='chunk_results',
+            field=models.JSONField(blank=True, help_text='Legacy intermediate results; superseded by ChunkResult rows.', null=True),
+        ),
+        migrations.CreateModel(
+            name='ChunkResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('idx', models.PositiveIntegerField()),
+                ('payload', models.JSONField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chunks', to='documents.processingjob')),
+            ],
+            options={
+                'ordering': ['idx'],
+                'constraints': [models.UniqueConstraint(fields=('job', 'idx'), name='chunkresult_job_idx_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.17 on 2026-08-31 01:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0011_alter_processingjob_chunk_results_chunkresult'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, default='', help_text='blake2b-128 digest of raw_text; keys the extraction result cache.', max_length=32),
+        ),
+    ]
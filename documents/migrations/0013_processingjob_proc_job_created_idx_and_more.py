@@ -0,0 +1,31 @@
+# Generated by Django 5.2.17 on 2026-08-31 01:42
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    # Concurrent index operations cannot run inside a transaction —
+    # ProcessingJob is the hot table and a plain CREATE INDEX would
+    # block writes for the duration of the build.
+    atomic = False
+
+    dependencies = [
+        ('documents', '0012_document_content_hash'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='processingjob',
+            index=models.Index(fields=['-created_at'], name='proc_job_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='processingjob',
+            index=models.Index(fields=['document', '-created_at'], name='proc_job_doc_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='processingjob',
+            index=models.Index(fields=['schema', '-created_at'], name='proc_job_schema_created_idx'),
+        ),
+    ]
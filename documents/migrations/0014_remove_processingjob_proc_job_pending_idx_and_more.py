@@ -0,0 +1,30 @@
+# Generated by Django 5.2.17 on 2026-08-31 01:45
+
+from django.contrib.postgres.operations import (
+    AddIndexConcurrently,
+    RemoveIndexConcurrently,
+)
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    # Concurrent index operations cannot run inside a transaction; build
+    # the replacement before dropping the old index so the active-status
+    # queries stay indexed throughout the rebuild.
+    atomic = False
+
+    dependencies = [
+        ('documents', '0013_processingjob_proc_job_created_idx_and_more'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='processingjob',
+            index=models.Index(condition=models.Q(('status__in', ['pending', 'processing', 'retrying'])), fields=['created_at'], name='proc_job_active_idx'),
+        ),
+        RemoveIndexConcurrently(
+            model_name='processingjob',
+            name='proc_job_pending_idx',
+        ),
+    ]
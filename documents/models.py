@@ -1,6 +1,38 @@
-from django.db import models
+import hashlib
+
+from django.core.cache import cache
+from django.db import connection, models
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 from django.contrib.postgres.indexes import GinIndex
 
+# How long cached ExtractionSchema instances stay valid. Saves/deletes
+# invalidate eagerly via signals, so this is just a safety net.
+SCHEMA_CACHE_TTL = 3600
+
+# Below this size, planner estimates are unreliable (never-analyzed tables
+# report -1 or 0) and an exact COUNT is cheap anyway.
+_ESTIMATE_THRESHOLD = 1000
+
+
+def approximate_count(model):
+    """
+    Approximate row count for a model from Postgres planner statistics.
+
+    Reads pg_class.reltuples — an O(1) catalog lookup instead of the
+    O(rows) heap scan COUNT(*) performs. Falls back to an exact count
+    when the estimate is below _ESTIMATE_THRESHOLD.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+            [model._meta.db_table],
+        )
+        estimate = cursor.fetchone()[0]
+    if estimate < _ESTIMATE_THRESHOLD:
+        return model.objects.count()
+    return estimate
+
 
 class ExtractionSchema(models.Model):
     """
@@ -37,6 +69,15 @@ class ExtractionSchema(models.Model):
         max_length=50, choices=LLM_PROVIDER_CHOICES, default="openai"
     )
     llm_model = models.CharField(max_length=100, default="gpt-4o")
+    field_count = models.GeneratedField(
+        expression=Coalesce(
+            models.Func("schema_definition__fields", function="jsonb_array_length"),
+            models.Value(0),
+        ),
+        output_field=models.PositiveIntegerField(),
+        db_persist=True,
+        help_text="Count of top-level fields, maintained by Postgres.",
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -44,13 +85,33 @@ class ExtractionSchema(models.Model):
         ordering = ["-created_at"]
         verbose_name = "Extraction Schema"
         verbose_name_plural = "Extraction Schemas"
+        indexes = [
+            # Backs the admin's ILIKE '%term%' search on name.
+            GinIndex(
+                fields=["name"],
+                opclasses=["gin_trgm_ops"],
+                name="schema_name_trgm_idx",
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
-    @property
-    def field_count(self):
-        return len(self.schema_definition.get("fields", []))
+    @classmethod
+    def get_cached(cls, pk):
+        """
+        Fetch a schema by pk through the default cache.
+        Returns None if the schema does not exist.
+        """
+        key = f"schema:{pk}"
+        schema = cache.get(key)
+        if schema is None:
+            try:
+                schema = cls.objects.get(pk=pk)
+            except (cls.DoesNotExist, ValueError):
+                return None
+            cache.set(key, schema, SCHEMA_CACHE_TTL)
+        return schema
 
 
 class Document(models.Model):
@@ -58,20 +119,73 @@ class Document(models.Model):
     Stores an uploaded document's raw text content and original file.
     """
 
+    class FileType(models.TextChoices):
+        MD = "md", "Markdown"
+        TXT = "txt", "Plain Text"
+        PDF = "pdf", "PDF"
+        DOCX = "docx", "DOCX"
+        HTML = "html", "HTML"
+        CSV = "csv", "CSV"
+        JSON = "json", "JSON"
+        OTHER = "other", "Other"
+
     title = models.CharField(max_length=255)
     raw_text = models.TextField()
     original_file = models.FileField(
         upload_to="documents/%Y/%m/", blank=True, null=True
     )
-    file_type = models.CharField(max_length=20, default="md")
+    file_type = models.CharField(
+        max_length=8, choices=FileType.choices, default=FileType.MD, db_index=True
+    )
+    content_hash = models.CharField(
+        max_length=32,
+        blank=True,
+        default="",
+        db_index=True,
+        help_text="blake2b-128 digest of raw_text; keys the extraction result cache.",
+    )
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            GinIndex(
+                fields=["title"],
+                opclasses=["gin_trgm_ops"],
+                name="doc_title_trgm_idx",
+            ),
+        ]
 
     def __str__(self):
         return self.title
 
+    @classmethod
+    def normalize_file_type(cls, ext):
+        """Map an arbitrary file extension onto a known FileType value."""
+        return ext if ext in cls.FileType.values else cls.FileType.OTHER
+
+    @staticmethod
+    def hash_text(text):
+        """blake2b-128 hex digest of document text."""
+        return hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+
+
+class ProcessingJobQuerySet(models.QuerySet):
+    def for_list(self):
+        """
+        Rows ready for list rendering: FKs joined in one query and the
+        SELECT narrowed to the columns list pages actually show.
+        """
+        return self.select_related("document", "schema").only(
+            "id",
+            "status",
+            "retry_count",
+            "created_at",
+            "completed_at",
+            "document__title",
+            "schema__name",
+        )
+
 
 class ProcessingJob(models.Model):
     """
@@ -93,12 +207,14 @@ class ProcessingJob(models.Model):
     schema = models.ForeignKey(
         ExtractionSchema, on_delete=models.CASCADE, related_name="jobs"
     )
-    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
+    status = models.CharField(
+        max_length=12, choices=STATUS_CHOICES, default="pending", db_index=True
+    )
     result_data = models.JSONField(null=True, blank=True)
     error_message = models.TextField(blank=True, default="")
     retry_count = models.IntegerField(default=0)
     max_retries = models.IntegerField(default=10)
-    celery_task_id = models.CharField(max_length=255, blank=True, default="")
+    celery_task_id = models.CharField(max_length=36, blank=True, default="")
     # Chunking fields
     is_chunked = models.BooleanField(default=False)
     total_chunks = models.IntegerField(default=0)
@@ -106,21 +222,135 @@ class ProcessingJob(models.Model):
     chunk_results = models.JSONField(
         null=True,
         blank=True,
-        help_text="Intermediate chunk results during chunked processing.",
+        help_text="Legacy intermediate results; superseded by ChunkResult rows.",
     )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     completed_at = models.DateTimeField(null=True, blank=True)
 
+    objects = ProcessingJobQuerySet.as_manager()
+
     class Meta:
         ordering = ["-created_at"]
         indexes = [
-            GinIndex(fields=["result_data"], name="result_data_gin_idx"),
+            # jsonb_path_ops only supports containment (@>) lookups but is
+            # roughly half the size of the default opclass and cheaper to
+            # update — we never use key-existence operators on result_data.
+            GinIndex(
+                fields=["result_data"],
+                opclasses=["jsonb_path_ops"],
+                name="result_data_gin_idx",
+            ),
+            models.Index(
+                fields=["status", "-created_at"], name="proc_job_status_created_idx"
+            ),
+            # "Newest jobs" orderings: global (job list), per document and
+            # per schema (detail pages, latest-job subqueries). Each turns
+            # an ORDER BY ... DESC LIMIT n filesort into an index scan.
+            models.Index(fields=["-created_at"], name="proc_job_created_idx"),
+            models.Index(
+                fields=["document", "-created_at"], name="proc_job_doc_created_idx"
+            ),
+            models.Index(
+                fields=["schema", "-created_at"], name="proc_job_schema_created_idx"
+            ),
+            # Tiny partial index over the in-flight slice of the table —
+            # serves the dashboard's active-jobs bucket and the polling
+            # EXISTS probe without touching completed/failed rows. The
+            # terminal statuses count fast off proc_job_status_created_idx.
+            models.Index(
+                fields=["created_at"],
+                condition=models.Q(
+                    status__in=["pending", "processing", "retrying"]
+                ),
+                name="proc_job_active_idx",
+            ),
+            # Most rows have an empty task id — only index the assigned ones.
+            models.Index(
+                fields=["celery_task_id"],
+                condition=~models.Q(celery_task_id=""),
+                name="proc_job_task_id_idx",
+            ),
         ]
 
     def __str__(self):
         return f"Job #{self.pk}: {self.document.title} → {self.schema.name} [{self.status}]"
 
+    def save(self, *args, update_fields=None, **kwargs):
+        # auto_now only fires for fields named in update_fields — append
+        # updated_at so partial saves can't silently skip the timestamp.
+        if update_fields is not None and "updated_at" not in update_fields:
+            update_fields = (*update_fields, "updated_at")
+        super().save(*args, update_fields=update_fields, **kwargs)
+
+    @classmethod
+    def record_chunk(cls, pk, idx, payload):
+        """
+        Record completion of one chunk: one ChunkResult row plus an atomic
+        counter bump — the job row itself no longer rewrites a growing
+        JSONB blob per chunk.
+        """
+        cls.record_chunks(pk, [(idx, payload)])
+
+    @classmethod
+    def record_chunks(cls, pk, chunk_rows):
+        """
+        Batch variant of record_chunk. ``chunk_rows`` is a list of
+        (idx, payload) pairs; rows land in one bulk INSERT and the
+        progress counter advances by the batch size in one UPDATE.
+        """
+        ChunkResult.objects.bulk_create(
+            [ChunkResult(job_id=pk, idx=idx, payload=payload)
+             for idx, payload in chunk_rows],
+            ignore_conflicts=True,
+        )
+        cls.objects.filter(pk=pk).update(
+            processed_chunks=models.F("processed_chunks") + len(chunk_rows),
+            updated_at=timezone.now(),
+        )
+
+
+class ChunkResult(models.Model):
+    """
+    Per-chunk extraction output for a chunked ProcessingJob.
+
+    One small row per chunk instead of rewriting the job's chunk_results
+    JSONB on every chunk — O(N) constant-size writes, and concurrent chunk
+    workers don't contend on the job row.
+    """
+
+    job = models.ForeignKey(
+        ProcessingJob, on_delete=models.CASCADE, related_name="chunks"
+    )
+    idx = models.PositiveIntegerField()
+    payload = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["idx"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["job", "idx"], name="chunkresult_job_idx_uniq"
+            ),
+        ]
+
+    def __str__(self):
+        return f"Chunk {self.idx} of job #{self.job_id}"
+
+
+class SchemaSuggestionQuerySet(models.QuerySet):
+    def for_list(self):
+        return self.select_related("document").only(
+            "id",
+            "status",
+            "suggested_name",
+            "llm_provider",
+            "llm_model",
+            "created_at",
+            "completed_at",
+            "document__title",
+        )
+
 
 class SchemaSuggestion(models.Model):
     """
@@ -138,7 +368,9 @@ class SchemaSuggestion(models.Model):
     document = models.ForeignKey(
         Document, on_delete=models.CASCADE, related_name="schema_suggestions"
     )
-    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
+    status = models.CharField(
+        max_length=12, choices=STATUS_CHOICES, default="pending", db_index=True
+    )
     suggested_name = models.CharField(max_length=255, blank=True, default="")
     suggested_description = models.TextField(blank=True, default="")
     suggested_schema = models.JSONField(
@@ -149,12 +381,24 @@ class SchemaSuggestion(models.Model):
     llm_provider = models.CharField(max_length=50, default="openai")
     llm_model = models.CharField(max_length=100, default="gpt-4o")
     error_message = models.TextField(blank=True, default="")
-    celery_task_id = models.CharField(max_length=255, blank=True, default="")
+    celery_task_id = models.CharField(max_length=36, blank=True, default="")
     created_at = models.DateTimeField(auto_now_add=True)
     completed_at = models.DateTimeField(null=True, blank=True)
 
+    objects = SchemaSuggestionQuerySet.as_manager()
+
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(
+                fields=["status", "-created_at"], name="suggestion_status_created_idx"
+            ),
+            GinIndex(
+                fields=["suggested_name"],
+                opclasses=["gin_trgm_ops"],
+                name="suggestion_name_trgm_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"Suggestion #{self.pk}: {self.document.title} [{self.status}]"
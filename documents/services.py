@@ -4,27 +4,70 @@ Converts user-defined schemas to JSON Schema and runs extraction.
 Includes: schema suggestion agent, semantic chunking, iterative accumulation.
 """
 
+import asyncio
 import csv
-import io
+import functools
+import hashlib
 import json
 import logging
 import os
 import re
+import uuid
+from collections import OrderedDict
+from types import MappingProxyType
 from typing import Any
 
-from pydantic_ai import Agent, StructuredDict
+from django.conf import settings
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# pydantic_ai is imported lazily inside the AI entry points — it is a heavy
+# import and paths like CSV export or provider listing never need it.
 
 logger = logging.getLogger(__name__)
 
 # ─── Chunking Configuration ───────────────────────────────────────────────
 
-# Characters threshold — documents above this are chunked automatically.
-# ~50K chars ≈ 12.5K tokens, leaving room for schema + accumulated result.
-CHUNK_THRESHOLD = 50_000
-# Target chunk size in characters.
-CHUNK_SIZE = 40_000
-# Overlap between chunks to avoid losing context at boundaries.
-CHUNK_OVERLAP = 2_000
+# Token threshold — documents above this are chunked automatically,
+# leaving room for the schema and system prompt in the context window.
+CHUNK_THRESHOLD = 12_500
+# Target chunk size in tokens.
+CHUNK_SIZE = 10_000
+# Overlap between chunks, in tokens, to avoid losing context at boundaries.
+CHUNK_OVERLAP = 500
+# Rough chars-per-token ratio, used to slice text by a token budget and to
+# estimate token counts when tiktoken is not installed.
+CHARS_PER_TOKEN = 4
+# How many chunk extractions may be in flight at once per document.
+MAX_CONCURRENT_CHUNKS = getattr(settings, "MAX_CONCURRENT_CHUNKS", 5)
+
+# Paragraph boundary: one or more blank lines.
+_PARAGRAPH_RE = re.compile(r"\n\s*\n+")
+
+
+@functools.lru_cache(maxsize=1)
+def _get_encoder():
+    """Return a shared tiktoken encoder, or None if tiktoken is missing."""
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    return tiktoken.get_encoding("cl100k_base")
+
+
+def _token_len(text: str) -> int:
+    """
+    Token count of ``text`` — exact via tiktoken when available, otherwise
+    the chars/4 approximation. Character counts alone under-budget
+    token-dense input (code, CJK) by up to ~3×.
+    """
+    encoder = _get_encoder()
+    if encoder is not None:
+        return len(encoder.encode(text, disallowed_special=()))
+    return len(text) // CHARS_PER_TOKEN + 1
 
 
 def schema_definition_to_json_schema(schema_definition: dict) -> dict:
@@ -103,10 +146,105 @@ def schema_definition_to_json_schema(schema_definition: dict) -> dict:
     return json_schema
 
 
+def _canonical_schema(schema_definition: dict) -> str:
+    """Stable JSON form of a schema definition, usable as a cache key."""
+    return json.dumps(schema_definition, sort_keys=True, ensure_ascii=False)
+
+
+def _schema_key(schema_definition: dict) -> str:
+    """
+    16-byte blake2b digest (hex) of the canonical definition — a compact
+    cache key; full canonical JSON can run to kilobytes per schema.
+    """
+    return hashlib.blake2b(
+        _canonical_schema(schema_definition).encode(), digest_size=16
+    ).hexdigest()
+
+
+# Caches for the schema pipeline, all digest-keyed and LRU-bounded. These
+# are per-process; StructuredDict/Agent hold compiled pydantic models and
+# can't be shared through Redis.
+_CACHE_MAX_ENTRIES = 256
+_JSON_SCHEMA_CACHE: OrderedDict = OrderedDict()
+_OUTPUT_TYPE_CACHE: OrderedDict = OrderedDict()
+_AGENT_CACHE: OrderedDict = OrderedDict()
+
+
+def _cache_get(cache: OrderedDict, key, factory):
+    """Bounded get-or-build with LRU eviction."""
+    value = cache.get(key)
+    if value is None:
+        value = factory()
+        cache[key] = value
+        if len(cache) > _CACHE_MAX_ENTRIES:
+            cache.popitem(last=False)
+    else:
+        cache.move_to_end(key)
+    return value
+
+
+def _json_schema_for(schema_definition: dict, key: str) -> dict:
+    """Cached schema_definition_to_json_schema, keyed by schema digest."""
+    return _cache_get(
+        _JSON_SCHEMA_CACHE,
+        key,
+        lambda: schema_definition_to_json_schema(schema_definition),
+    )
+
+
+def _build_output_type(
+    schema_definition: dict, key: str, safe_name: str, description: str
+):
+    """
+    Cached StructuredDict for a schema definition.
+
+    StructuredDict triggers pydantic schema compilation, which is far more
+    expensive than the dict-to-JSON-Schema conversion — build it once per
+    (schema, name, description) and reuse across chunks and documents.
+    """
+    from pydantic_ai import StructuredDict
+
+    return _cache_get(
+        _OUTPUT_TYPE_CACHE,
+        (key, safe_name, description),
+        lambda: StructuredDict(
+            _json_schema_for(schema_definition, key),
+            name=safe_name,
+            description=description,
+        ),
+    )
+
+
+def _get_agent(
+    model_name: str, schema_definition: dict, safe_name: str, description: str,
+    system_prompt: str,
+):
+    """
+    Cached Agent per (model, schema, prompt).
+
+    Documents extracted against the same saved schema or preset — the
+    common case in bulk processing — share one Agent instance instead of
+    rebuilding it per document.
+    """
+    from pydantic_ai import Agent
+
+    key = _schema_key(schema_definition)
+    return _cache_get(
+        _AGENT_CACHE,
+        (model_name, key, safe_name, description, system_prompt),
+        lambda: Agent(
+            model_name,
+            output_type=_build_output_type(
+                schema_definition, key, safe_name, description
+            ),
+            retries=3,
+            system_prompt=system_prompt,
+        ),
+    )
+
+
 def _set_api_key_env(provider: str) -> None:
     """Ensure the appropriate API key env var is set for the provider."""
-    from django.conf import settings
-
     key_map = {
         "openai": ("OPENAI_API_KEY", settings.OPENAI_API_KEY),
         "anthropic": ("ANTHROPIC_API_KEY", settings.ANTHROPIC_API_KEY),
@@ -121,6 +259,15 @@ def _set_api_key_env(provider: str) -> None:
         os.environ["OPENAI_BASE_URL"] = settings.OPENAI_BASE_URL
 
 
+_SINGLE_PASS_SYSTEM_PROMPT = (
+    "You are a document data extraction specialist. "
+    "Given a document, extract structured information strictly according to the provided schema. "
+    "Use the field descriptions as guidance for what information to extract. "
+    "Be thorough and accurate. If a field's data is not found in the document, use null. "
+    "Return ONLY the structured data — no explanations."
+)
+
+
 def process_document_with_ai(
     document_text: str,
     schema_name: str,
@@ -137,31 +284,13 @@ def process_document_with_ai(
     """
     _set_api_key_env(llm_provider)
 
-    json_schema = schema_definition_to_json_schema(schema_definition)
-    logger.info("Generated JSON Schema for '%s': %s", schema_name, json_schema)
-
-    safe_name = schema_name.replace(" ", "_").replace("-", "_")
-
-    output_type = StructuredDict(
-        json_schema,
-        name=safe_name,
-        description=schema_description
+    agent = _get_agent(
+        f"{llm_provider}:{llm_model}",
+        schema_definition,
+        schema_name.replace(" ", "_").replace("-", "_"),
+        schema_description
         or f"Extract structured data using the '{schema_name}' schema.",
-    )
-
-    model_name = f"{llm_provider}:{llm_model}"
-
-    agent = Agent(
-        model_name,
-        output_type=output_type,
-        retries=3,
-        system_prompt=(
-            "You are a document data extraction specialist. "
-            "Given a document, extract structured information strictly according to the provided schema. "
-            "Use the field descriptions as guidance for what information to extract. "
-            "Be thorough and accurate. If a field's data is not found in the document, use null. "
-            "Return ONLY the structured data — no explanations."
-        ),
+        _SINGLE_PASS_SYSTEM_PROMPT,
     )
 
     result = agent.run_sync(document_text)
@@ -172,79 +301,76 @@ def process_document_with_ai(
 
 
 def should_chunk(text: str, threshold: int = CHUNK_THRESHOLD) -> bool:
-    """Return True if the document exceeds the chunking threshold."""
-    return len(text) > threshold
+    """Return True if the document's token count exceeds the threshold."""
+    return _token_len(text) > threshold
 
 
 def chunk_document(
     text: str,
-    max_chunk_size: int = CHUNK_SIZE,
-    overlap: int = CHUNK_OVERLAP,
+    max_chunk_tokens: int = CHUNK_SIZE,
+    overlap_tokens: int = CHUNK_OVERLAP,
 ) -> list[str]:
     """
     Split document text into semantically meaningful chunks.
 
     Strategy:
-    1. Split by double-newlines (paragraphs) or markdown headers.
-    2. Accumulate paragraphs into chunks up to max_chunk_size.
+    1. Split by double-newlines (paragraphs), normalizing separators to "\n\n".
+    2. Accumulate paragraphs into chunks up to max_chunk_tokens.
     3. Add overlap from previous chunk's last paragraphs.
 
+    Budgets are in tokens (see _token_len); slicing positions inside a
+    paragraph still use a chars-per-token estimate.
+
     Returns a list of text chunks.
     """
-    # Split by double-newline or markdown header boundaries
-    # We keep the header with the paragraph that follows it
-    segments = re.split(r"(\n\s*\n)", text)
-
-    # Rebuild paragraphs (keeping separators attached)
-    paragraphs: list[str] = []
-    current = ""
-    for segment in segments:
-        current += segment
-        # A double-newline separator marks end of a paragraph
-        if segment.strip() == "":
-            if current.strip():
-                paragraphs.append(current)
-            current = ""
-    if current.strip():
-        paragraphs.append(current)
+    max_chunk_chars = max_chunk_tokens * CHARS_PER_TOKEN
+    overlap_chars = overlap_tokens * CHARS_PER_TOKEN
+
+    # One non-capturing split gives the paragraphs directly — no Python
+    # loop rebuilding them segment by segment with string concatenation.
+    paragraphs = [p for p in _PARAGRAPH_RE.split(text) if p.strip()]
 
     if not paragraphs:
         # Fallback: split by fixed size if no paragraph boundaries
-        return _fixed_size_chunk(text, max_chunk_size, overlap)
+        return _fixed_size_chunk(text, max_chunk_chars, overlap_chars)
 
     chunks: list[str] = []
     current_chunk: list[str] = []
-    current_size = 0
+    current_tokens = 0
 
     for para in paragraphs:
-        para_size = len(para)
+        para_tokens = _token_len(para) + 1  # account for the "\n\n" joiner
 
         # If single paragraph exceeds max, split it by fixed size
-        if para_size > max_chunk_size:
+        if para_tokens > max_chunk_tokens:
             # Flush what we have
             if current_chunk:
-                chunks.append("".join(current_chunk))
+                chunks.append("\n\n".join(current_chunk))
                 current_chunk = []
-                current_size = 0
+                current_tokens = 0
             # Split the big paragraph
-            sub_chunks = _fixed_size_chunk(para, max_chunk_size, overlap)
+            sub_chunks = _fixed_size_chunk(para, max_chunk_chars, overlap_chars)
             chunks.extend(sub_chunks)
             continue
 
-        if current_size + para_size > max_chunk_size and current_chunk:
+        if current_tokens + para_tokens > max_chunk_tokens and current_chunk:
             # Finalize current chunk
-            chunks.append("".join(current_chunk))
-            # Start new chunk with overlap from end of previous
-            overlap_text = "".join(current_chunk)[-overlap:] if overlap > 0 else ""
+            chunk_text = "\n\n".join(current_chunk)
+            chunks.append(chunk_text)
+            # Start new chunk with overlap from end of previous — an O(overlap)
+            # slice of the string we just emitted, never a second full join.
+            overlap_text = chunk_text[-overlap_chars:] if overlap_tokens > 0 else ""
             current_chunk = [overlap_text, para] if overlap_text else [para]
-            current_size = len(overlap_text) + para_size
+            # The slice is overlap_chars long by construction, so its token
+            # count is ~overlap_tokens — no need to re-encode it every flush.
+            current_tokens = (overlap_tokens if overlap_text else 0) + para_tokens
         else:
             current_chunk.append(para)
-            current_size += para_size
+            current_tokens += para_tokens
 
     # Don't forget the last chunk
     if current_chunk:
-        chunks.append("".join(current_chunk))
+        chunks.append("\n\n".join(current_chunk))
 
     logger.info("Document split into %d chunks (sizes: %s)", len(chunks),
                 [len(c) for c in chunks])
@@ -253,16 +379,50 @@ def chunk_document(
 
 def _fixed_size_chunk(text: str, size: int, overlap: int) -> list[str]:
     """Fallback: split by fixed character size with overlap."""
-    chunks = []
-    start = 0
-    while start < len(text):
-        end = start + size
-        chunks.append(text[start:end])
-        start = end - overlap if overlap > 0 else end
-    return chunks
+    step = size - overlap if overlap > 0 else size
+    return [text[start:start + size] for start in range(0, len(text), step)]
 
 
-def process_document_chunked(
+def pack_chunks(chunks: list[str], max_batch_tokens: int = CHUNK_SIZE) -> list[str]:
+    """
+    Greedily merge consecutive chunks into batches that fill the token
+    budget — each batch is one LLM call.
+
+    chunk_document already aims for the budget, but heavily sectioned
+    documents and fixed-size fallback splits can leave runs of small
+    fragments; packing collapses several round-trips into one.
+    """
+    batches: list[str] = []
+    current: list[str] = []
+    current_tokens = 0
+
+    for chunk in chunks:
+        chunk_tokens = _token_len(chunk) + 1
+        if current and current_tokens + chunk_tokens > max_batch_tokens:
+            batches.append("\n\n".join(current))
+            current = []
+            current_tokens = 0
+        current.append(chunk)
+        current_tokens += chunk_tokens
+
+    if current:
+        batches.append("\n\n".join(current))
+    return batches
+
+
+_CHUNK_SYSTEM_PROMPT = (
+    "You are a document data extraction specialist. "
+    "You are processing ONE chunk of a longer document that was split for processing. "
+    "Extract structured information strictly according to the provided schema "
+    "from THIS chunk only. Use the field descriptions as guidance. "
+    "If a field's data is not found in this chunk, use null. "
+    "For array fields, include all items found in this chunk. "
+    "Results from all chunks are merged programmatically afterwards. "
+    "Return ONLY the structured data — no explanations."
+)
+
+
+async def process_document_chunked_async(
     document_text: str,
     schema_name: str,
     schema_description: str,
@@ -270,107 +430,118 @@ def process_document_chunked(
     llm_provider: str,
     llm_model: str,
     on_chunk_complete: Any = None,
+    max_concurrency: int = MAX_CONCURRENT_CHUNKS,
+    chunks: list[str] | None = None,
 ) -> dict:
     """
-    Process a long document by chunking and iteratively accumulating results.
+    Process a long document with a map-reduce strategy.
 
-    For each chunk:
-    1. Send the chunk + accumulated result so far to the LLM.
-    2. The LLM returns an updated/extended structured result.
-    3. The accumulated result is passed to the next chunk.
+    Map: every chunk is extracted independently (and concurrently, bounded
+    by a semaphore) — chunks don't need to see each other's results.
+    Reduce: partial results are folded together with _deep_merge, which is
+    the source of truth for combining chunk outputs.
 
     Args:
-        on_chunk_complete: Optional callback(chunk_index, total_chunks, accumulated_result)
-                          for progress tracking.
+        on_chunk_complete: Optional callback(chunk_index, total_chunks, chunk_result)
+                          for progress tracking, invoked as chunks finish.
+        chunks: Pre-packed chunk batches. Callers that already chunked the
+                text (the Celery task counts them for progress tracking)
+                pass them in so the document isn't tokenized twice.
     Returns:
-        The final accumulated structured result.
+        The final merged structured result.
     """
     _set_api_key_env(llm_provider)
 
-    chunks = chunk_document(document_text)
-    json_schema = schema_definition_to_json_schema(schema_definition)
-    safe_name = schema_name.replace(" ", "_").replace("-", "_")
-    model_name = f"{llm_provider}:{llm_model}"
+    if chunks is None:
+        chunks = pack_chunks(chunk_document(document_text))
+
+    if len(chunks) == 1:
+        # One chunk — skip the gather/merge machinery and use the plain
+        # single-pass path (in a thread: it drives the agent with run_sync).
+        return await asyncio.to_thread(
+            process_document_with_ai,
+            document_text,
+            schema_name,
+            schema_description,
+            schema_definition,
+            llm_provider,
+            llm_model,
+        )
 
-    accumulated_result: dict | None = None
+    agent = _get_agent(
+        f"{llm_provider}:{llm_model}",
+        schema_definition,
+        schema_name.replace(" ", "_").replace("-", "_"),
+        schema_description
+        or f"Extract structured data using the '{schema_name}' schema.",
+        _CHUNK_SYSTEM_PROMPT,
+    )
 
-    for i, chunk in enumerate(chunks):
-        logger.info("Processing chunk %d/%d (%d chars)", i + 1, len(chunks), len(chunk))
-
-        if accumulated_result is None:
-            # First chunk — extract from scratch
-            system_prompt = (
-                "You are a document data extraction specialist. "
-                "You are processing a LONG document in multiple chunks. This is the FIRST chunk. "
-                "Extract structured information strictly according to the provided schema. "
-                "Use the field descriptions as guidance. "
-                "If a field's data is not found yet, use null. "
-                "For array fields, include all items found in this chunk. "
-                "Return ONLY the structured data — no explanations."
-            )
-            user_message = chunk
-        else:
-            # Subsequent chunks — pass accumulated result + new chunk in the user message
-            accumulated_json = json.dumps(accumulated_result, ensure_ascii=False, indent=2)
-            system_prompt = (
-                "You are a document data extraction specialist. "
-                f"You are processing chunk {i + 1} of {len(chunks)} of a long document.\n\n"
-                "CRITICAL RULES:\n"
-                "- You will receive a PREVIOUS RESULT (JSON) and a NEW CHUNK of text.\n"
-                "- The PREVIOUS RESULT contains ALL data extracted from earlier chunks. "
-                "You MUST preserve every single value in it.\n"
-                "- Read the NEW CHUNK and extract any additional information according to the schema.\n"
-                "- MERGE the new data INTO the previous result:\n"
-                "   * Array fields: APPEND new items to the existing array. NEVER remove existing items.\n"
-                "   * Scalar fields (string, number, boolean): KEEP the existing value UNLESS it is null "
-                "and the new chunk has a value, or the new chunk provides a clearly more complete value.\n"
-                "   * Object fields: recursively merge sub-fields using the same rules.\n"
-                "- The output MUST contain ALL data from the previous result PLUS any new data from this chunk.\n"
-                "- If the new chunk has no relevant new data, return the previous result unchanged.\n"
-                "- Return ONLY the structured JSON — no explanations."
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def run_chunk(index: int, chunk: str) -> dict:
+        async with semaphore:
+            logger.info(
+                "Processing chunk %d/%d (%d chars)", index + 1, len(chunks), len(chunk)
             )
-            user_message = (
-                "=== PREVIOUS RESULT (preserve ALL of this data) ===\n"
-                f"```json\n{accumulated_json}\n```\n\n"
-                "=== NEW CHUNK (extract new data from this and merge) ===\n"
-                f"{chunk}"
+            result = await agent.run(chunk)
+        if on_chunk_complete:
+            # The callback touches the DB — run it in a worker thread so
+            # Django's sync ORM isn't called from the event loop.
+            await asyncio.to_thread(
+                on_chunk_complete, index, len(chunks), result.output
             )
+        return result.output
 
-        output_type = StructuredDict(
-            json_schema,
-            name=safe_name,
-            description=schema_description
-            or f"Extract structured data using the '{schema_name}' schema.",
-        )
+    chunk_results = await asyncio.gather(
+        *(run_chunk(i, chunk) for i, chunk in enumerate(chunks))
+    )
 
-        agent = Agent(
-            model_name,
-            output_type=output_type,
-            retries=3,
-            system_prompt=system_prompt,
-        )
+    accumulated_result: dict | None = None
+    for chunk_result in chunk_results:
+        accumulated_result = _deep_merge_inplace(accumulated_result, chunk_result)
 
-        result = agent.run_sync(user_message)
-        new_result = result.output
+    return _canonicalize(accumulated_result) if accumulated_result else {}
 
-        if accumulated_result is not None:
-            # Safety net: programmatic merge to guarantee no data is lost.
-            # The LLM output should already be merged, but we enforce it.
-            accumulated_result = _deep_merge(accumulated_result, new_result)
-        else:
-            accumulated_result = new_result
 
-        logger.info(
-            "Chunk %d/%d done. Accumulated keys: %s",
-            i + 1,
-            len(chunks),
-            list(accumulated_result.keys()) if accumulated_result else "N/A",
+def process_document_chunked(
+    document_text: str,
+    schema_name: str,
+    schema_description: str,
+    schema_definition: dict,
+    llm_provider: str,
+    llm_model: str,
+    on_chunk_complete: Any = None,
+    chunks: list[str] | None = None,
+) -> dict:
+    """Sync wrapper around process_document_chunked_async for Celery tasks."""
+    return asyncio.run(
+        process_document_chunked_async(
+            document_text=document_text,
+            schema_name=schema_name,
+            schema_description=schema_description,
+            schema_definition=schema_definition,
+            llm_provider=llm_provider,
+            llm_model=llm_model,
+            on_chunk_complete=on_chunk_complete,
+            chunks=chunks,
         )
+    )
 
-        if on_chunk_complete:
-            on_chunk_complete(i, len(chunks), accumulated_result)
 
-    return accumulated_result or {}
+def _is_empty(value: Any) -> bool:
+    """
+    True for values carrying no information: None, "" and empty containers.
+
+    Deliberately not truthiness-based — 0 and False are legitimate
+    extracted values and must not be overwritten by later chunks (the old
+    tuple-membership test treated them as empty because ``0 == False``).
+    """
+    return (
+        value is None
+        or value == ""
+        or (isinstance(value, (list, dict)) and not value)
+    )
 
 
 def _deep_merge(base: Any, update: Any) -> Any:
@@ -379,10 +550,12 @@ def _deep_merge(base: Any, update: Any) -> Any:
 
     Rules:
     - Both dicts: recursively merge keys. For shared keys, merge values.
-    - Both lists: concatenate, then deduplicate (keep order, remove exact dupes).
+    - Both lists: concatenate (exact duplicates are removed once, at the
+      end of the reduce, by _canonicalize).
     - base is None / empty: use update.
     - update is None / empty: keep base.
-    - Scalar conflict: prefer update only if base is None.
+    - Two strings: the longer (more complete) one wins.
+    - Other scalar conflict: prefer update only if base is empty.
     """
     if base is None:
         return update
@@ -399,24 +572,79 @@ def _deep_merge(base: Any, update: Any) -> Any:
         return merged
 
     if isinstance(base, list) and isinstance(update, list):
-        # Append new items, deduplicate by JSON serialization
+        # Concatenate only — deduplicating here would re-serialize base
+        # items on every fold step. _canonicalize dedupes once at the end.
+        return base + update
+
+    # Strings: chunks see partial views of the same value — keep the more
+    # complete one. This replaces the old "ask the LLM to pick" behaviour.
+    if isinstance(base, str) and isinstance(update, str):
+        return update if len(update) > len(base) else base
+
+    # Other scalars: keep base unless it's empty
+    if _is_empty(base) and not _is_empty(update):
+        return update
+    return base
+
+
+def _deep_merge_inplace(base: Any, update: Any) -> Any:
+    """
+    _deep_merge variant that mutates ``base`` dicts instead of copying them.
+
+    Only safe when the caller owns the accumulator — the reduce loop does,
+    since every input is a chunk result produced in this process. Avoids
+    the O(|accumulated|) dict copy _deep_merge pays on every fold step.
+    """
+    if base is None:
+        return update
+    if update is None:
+        return base
+
+    if isinstance(base, dict) and isinstance(update, dict):
+        for key, update_val in update.items():
+            if key in base:
+                base[key] = _deep_merge_inplace(base[key], update_val)
+            else:
+                base[key] = update_val
+        return base
+
+    return _deep_merge(base, update)
+
+
+def _canonicalize(node: Any) -> Any:
+    """
+    Deduplicate every list in a merged result, keeping first-seen order.
+
+    Runs once after the reduce, so each item is serialized for comparison
+    exactly once — not once per pairwise merge.
+    """
+    if isinstance(node, dict):
+        return {key: _canonicalize(value) for key, value in node.items()}
+    if isinstance(node, list):
         seen = set()
-        combined = []
-        for item in base + update:
-            # Use JSON for hashable comparison of dicts/lists
+        out = []
+        for item in node:
+            item = _canonicalize(item)
+            # Use compact canonical JSON for hashable comparison of
+            # dicts/lists — orjson when available, it's several times
+            # faster than stdlib json on these small payloads.
             try:
-                key = json.dumps(item, sort_keys=True, ensure_ascii=False)
+                if orjson is not None:
+                    key = orjson.dumps(item, option=orjson.OPT_SORT_KEYS)
+                else:
+                    key = json.dumps(item, sort_keys=True, ensure_ascii=False)
             except (TypeError, ValueError):
                 key = str(item)
+            if len(key) > 64:
+                # Large items: keep a 16-byte digest in the seen-set
+                # instead of the full serialized blob.
+                raw = key if isinstance(key, bytes) else key.encode()
+                key = hashlib.blake2b(raw, digest_size=16).digest()
             if key not in seen:
                 seen.add(key)
-                combined.append(item)
-        return combined
-
-    # Scalars: keep base unless it's None/empty
-    if base in (None, "", 0, False) and update not in (None, "", 0, False):
-        return update
-    return base
+                out.append(item)
+        return out
+    return node
 
 
 # ─── Schema Suggestion Agent ─────────────────────────────────────────────
@@ -438,15 +666,18 @@ def suggest_schema_for_document(
       - description: suggested schema description
       - schema_definition: {"fields": [...]} in internal format
     """
+    from pydantic_ai import Agent, StructuredDict
+
     _set_api_key_env(llm_provider)
 
     # Use a sample of the document to avoid huge prompts.
-    # Take first 12000 chars + last 3000 chars for a balanced view.
+    # Take first 12000 chars + last 3000 chars for a balanced view; the
+    # f-string builds the sample in one pass with no intermediate concats.
     if len(document_text) > 16000:
         sample = (
-            document_text[:12000]
-            + "\n\n... [document truncated for analysis] ...\n\n"
-            + document_text[-3000:]
+            f"{document_text[:12000]}"
+            "\n\n... [document truncated for analysis] ...\n\n"
+            f"{document_text[-3000:]}"
         )
     else:
         sample = document_text
@@ -602,21 +833,21 @@ def suggest_schema_for_document(
     )
     suggestion = result.output
 
-    # Ensure each field has an 'id'
-    import uuid
-
-    def _ensure_ids(fields: list) -> list:
-        for field in fields:
-            if "id" not in field:
-                field["id"] = str(uuid.uuid4())
-            if field.get("fields"):
-                _ensure_ids(field["fields"])
-            if field.get("items", {}).get("fields"):
-                _ensure_ids(field["items"]["fields"])
-        return fields
-
+    # Ensure each field has an 'id': walk the tree iteratively, collect
+    # the fields missing one, then assign batch-generated UUIDs.
     fields = suggestion.get("fields", [])
-    _ensure_ids(fields)
+    missing: list[dict] = []
+    stack = list(fields)
+    while stack:
+        field = stack.pop()
+        if "id" not in field:
+            missing.append(field)
+        if field.get("fields"):
+            stack.extend(field["fields"])
+        if field.get("items", {}).get("fields"):
+            stack.extend(field["items"]["fields"])
+    for field, field_id in zip(missing, [str(uuid.uuid4()) for _ in missing]):
+        field["id"] = field_id
 
     return {
         "name": suggestion.get("name", "Suggested Schema"),
@@ -625,51 +856,78 @@ def suggest_schema_for_document(
     }
 
 
+def _flatten_items(data: Any) -> dict[tuple, Any]:
+    """
+    Flatten a nested dict/list into a dict keyed by path tuples.
+
+    Iterative (explicit stack) rather than recursive: every leaf lands
+    directly in one output dict, with no per-level dict merges and no
+    recursion-depth limit on deeply nested results. Keys stay tuples in
+    this hot path — each leaf's dotted name is only formatted once, at
+    output time, instead of one intermediate string per ancestor level.
+    """
+    items: dict[tuple, Any] = {}
+    stack: list[tuple[tuple, Any]] = [((), data)]
+
+    while stack:
+        key, node = stack.pop()
+        if isinstance(node, dict):
+            for sub_key, value in node.items():
+                stack.append((key + (sub_key,), value))
+        elif isinstance(node, list):
+            for i, value in enumerate(node):
+                stack.append((key + (str(i),), value))
+        else:
+            items[key] = node
+
+    return items
+
+
 def flatten_json(data: Any, prefix: str = "") -> dict:
     """
     Flatten a nested dict/list into a flat dict with dot-notation keys.
     Useful for CSV export.
     """
-    items: dict[str, Any] = {}
+    return {
+        ".".join((prefix, *key) if prefix else key): value
+        for key, value in _flatten_items(data).items()
+    }
 
-    if isinstance(data, dict):
-        for key, value in data.items():
-            new_key = f"{prefix}.{key}" if prefix else key
-            if isinstance(value, (dict, list)):
-                items.update(flatten_json(value, new_key))
-            else:
-                items[new_key] = value
-    elif isinstance(data, list):
-        for i, item in enumerate(data):
-            new_key = f"{prefix}.{i}"
-            if isinstance(item, (dict, list)):
-                items.update(flatten_json(item, new_key))
-            else:
-                items[new_key] = item
-    else:
-        items[prefix] = data
 
-    return items
+class _Echo:
+    """Pseudo-buffer for csv.writer that hands each row straight back."""
 
+    def write(self, value):
+        return value
 
-def export_result_as_csv(result_data: dict) -> str:
+
+def export_result_as_csv_iter(result_data: dict):
     """
-    Convert a structured JSON result into CSV text.
+    Yield a structured JSON result as CSV lines, one row at a time.
     Handles nested data by flattening with dot-notation keys.
+
+    Suitable for StreamingHttpResponse — no full-export buffer is built.
     """
-    flat = flatten_json(result_data)
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow(["Field", "Value"])
+    flat = _flatten_items(result_data)
+    writer = csv.writer(_Echo())
+    yield writer.writerow(["Field", "Value"])
     for key, value in sorted(flat.items()):
-        writer.writerow([key, value])
-    return output.getvalue()
+        yield writer.writerow([".".join(key), value])
+
+
+def export_result_as_csv(result_data: dict) -> str:
+    """Convert a structured JSON result into CSV text in one string."""
+    return "".join(export_result_as_csv_iter(result_data))
 
 
+@functools.lru_cache(maxsize=1)
 def get_available_providers() -> list[dict]:
-    """Return list of configured LLM providers (those with API keys set)."""
-    from django.conf import settings
+    """
+    Return list of configured LLM providers (those with API keys set).
 
+    Memoized — API keys come from settings, which are fixed for the
+    process lifetime, so the list is built once instead of per request.
+    """
     providers = []
     if settings.OPENAI_API_KEY:
         providers.append(
@@ -708,19 +966,40 @@ def get_available_providers() -> list[dict]:
 
 # ─── Built-in Schema Presets ─────────────────────────────────────────────
 
-import uuid as _uuid
 
+# Namespace for preset field ids — uuid5 makes them deterministic, so the
+# same preset field has the same id across processes, requests and clients.
+_PRESET_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_DNS, "docxtract.schema-presets")
 
-def _uid() -> str:
-    return str(_uuid.uuid4())
 
+def _uid(path: str) -> str:
+    return str(uuid.uuid5(_PRESET_NAMESPACE, path))
 
-def get_schema_presets() -> list[dict]:
+
+def _freeze(node):
+    """
+    Recursively freeze a JSON-like structure: dicts become read-only
+    MappingProxyType views, lists become tuples. Scalars pass through.
+    """
+    if isinstance(node, dict):
+        return MappingProxyType({key: _freeze(value) for key, value in node.items()})
+    if isinstance(node, list):
+        return tuple(_freeze(item) for item in node)
+    return node
+
+
+@functools.lru_cache(maxsize=1)
+def get_schema_presets() -> tuple:
     """
     Return built-in schema presets for common extraction patterns.
     These cover documents where the user doesn't know what structure to expect.
+
+    Built once per process and frozen — every request thread shares the
+    same immutable object, and mutation bugs fail loudly instead of
+    corrupting the shared catalog. JSON encoding thaws the proxies (see
+    config.encoders.AppJSONEncoder).
     """
-    return [
+    return _freeze([
         {
             "key": "toc",
             "label": "Table of Contents",
@@ -731,14 +1010,14 @@ def get_schema_presets() -> list[dict]:
                 "schema_definition": {
                     "fields": [
                         {
-                            "id": _uid(),
+                            "id": _uid("toc.title"),
                             "name": "title",
                             "type": "string",
                             "description": "The document title or main heading.",
                             "required": True,
                         },
                         {
-                            "id": _uid(),
+                            "id": _uid("toc.sections"),
                             "name": "sections",
                             "type": "array",
                             "description": "Top-level sections/headings in order.",
@@ -747,21 +1026,21 @@ def get_schema_presets() -> list[dict]:
                                 "type": "object",
                                 "fields": [
                                     {
-                                        "id": _uid(),
+                                        "id": _uid("toc.heading"),
                                         "name": "heading",
                                         "type": "string",
                                         "description": "Section heading text.",
                                         "required": True,
                                     },
                                     {
-                                        "id": _uid(),
+                                        "id": _uid("toc.level"),
                                         "name": "level",
                                         "type": "integer",
                                         "description": "Heading level (1=top, 2=sub, etc.).",
                                         "required": True,
                                     },
                                     {
-                                        "id": _uid(),
+                                        "id": _uid("toc.subsections"),
                                         "name": "subsections",
                                         "type": "array",
                                         "description": "Child sections under this heading.",
@@ -770,14 +1049,14 @@ def get_schema_presets() -> list[dict]:
                                             "type": "object",
                                             "fields": [
                                                 {
-                                                    "id": _uid(),
+                                                    "id": _uid("toc.heading.1"),
                                                     "name": "heading",
                                                     "type": "string",
                                                     "description": "Subsection heading.",
                                                     "required": True,
                                                 },
                                                 {
-                                                    "id": _uid(),
+                                                    "id": _uid("toc.level.1"),
                                                     "name": "level",
                                                     "type": "integer",
                                                     "description": "Heading level.",
@@ -803,7 +1082,7 @@ def get_schema_presets() -> list[dict]:
                 "schema_definition": {
                     "fields": [
                         {
-                            "id": _uid(),
+                            "id": _uid("tables.tables"),
                             "name": "tables",
                             "type": "array",
                             "description": "All tables found in the document.",
@@ -812,14 +1091,14 @@ def get_schema_presets() -> list[dict]:
                                 "type": "object",
                                 "fields": [
                                     {
-                                        "id": _uid(),
+                                        "id": _uid("tables.table_title"),
                                         "name": "table_title",
                                         "type": "string",
                                         "description": "Title or caption of the table, if any.",
                                         "required": False,
                                     },
                                     {
-                                        "id": _uid(),
+                                        "id": _uid("tables.headers"),
                                         "name": "headers",
                                         "type": "array",
                                         "description": "Column headers of the table.",
@@ -827,7 +1106,7 @@ def get_schema_presets() -> list[dict]:
                                         "items": {"type": "string"},
                                     },
                                     {
-                                        "id": _uid(),
+                                        "id": _uid("tables.rows"),
                                         "name": "rows",
                                         "type": "array",
                                         "description": "Data rows. Each row is an array of cell values.",
@@ -854,7 +1133,7 @@ def get_schema_presets() -> list[dict]:
                 "schema_definition": {
                     "fields": [
                         {
-                            "id": _uid(),
+                            "id": _uid("key_values.entries"),
                             "name": "entries",
                             "type": "array",
                             "description": "All key-value pairs found in the document.",
@@ -863,21 +1142,21 @@ def get_schema_presets() -> list[dict]:
                                 "type": "object",
                                 "fields": [
                                     {
-                                        "id": _uid(),
+                                        "id": _uid("key_values.key"),
                                         "name": "key",
                                         "type": "string",
                                         "description": "The label, field name, or key.",
                                         "required": True,
                                     },
                                     {
-                                        "id": _uid(),
+                                        "id": _uid("key_values.value"),
                                         "name": "value",
                                         "type": "string",
                                         "description": "The corresponding value.",
                                         "required": True,
                                     },
                                     {
-                                        "id": _uid(),
+                                        "id": _uid("key_values.category"),
                                         "name": "category",
                                         "type": "string",
                                         "description": "Optional category or section this pair belongs to.",
@@ -900,35 +1179,35 @@ def get_schema_presets() -> list[dict]:
                 "schema_definition": {
                     "fields": [
                         {
-                            "id": _uid(),
+                            "id": _uid("summary.title"),
                             "name": "title",
                             "type": "string",
                             "description": "Document title or subject.",
                             "required": True,
                         },
                         {
-                            "id": _uid(),
+                            "id": _uid("summary.document_type"),
                             "name": "document_type",
                             "type": "string",
                             "description": "Type of document (report, letter, invoice, contract, etc.).",
                             "required": True,
                         },
                         {
-                            "id": _uid(),
+                            "id": _uid("summary.language"),
                             "name": "language",
                             "type": "string",
                             "description": "Primary language of the document.",
                             "required": False,
                         },
                         {
-                            "id": _uid(),
+                            "id": _uid("summary.summary"),
                             "name": "summary",
                             "type": "string",
                             "description": "A concise summary of the document content.",
                             "required": True,
                         },
                         {
-                            "id": _uid(),
+                            "id": _uid("summary.key_points"),
                             "name": "key_points",
                             "type": "array",
                             "description": "Main points or findings in the document.",
@@ -936,7 +1215,7 @@ def get_schema_presets() -> list[dict]:
                             "items": {"type": "string"},
                         },
                         {
-                            "id": _uid(),
+                            "id": _uid("summary.entities"),
                             "name": "entities",
                             "type": "array",
                             "description": "Named entities (people, organizations, dates, amounts) found.",
@@ -945,14 +1224,14 @@ def get_schema_presets() -> list[dict]:
                                 "type": "object",
                                 "fields": [
                                     {
-                                        "id": _uid(),
+                                        "id": _uid("summary.name"),
                                         "name": "name",
                                         "type": "string",
                                         "description": "Entity name or value.",
                                         "required": True,
                                     },
                                     {
-                                        "id": _uid(),
+                                        "id": _uid("summary.type"),
                                         "name": "type",
                                         "type": "string",
                                         "description": "Entity type (person, org, date, amount, location, etc.).",
@@ -965,4 +1244,4 @@ def get_schema_presets() -> list[dict]:
                 },
             },
         },
-    ]
+    ])
@@ -0,0 +1,15 @@
+"""
+Cache invalidation hooks for the documents app.
+"""
+
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import ExtractionSchema
+
+
+@receiver(post_save, sender=ExtractionSchema)
+@receiver(post_delete, sender=ExtractionSchema)
+def invalidate_schema_cache(sender, instance, **kwargs):
+    cache.delete(f"schema:{instance.pk}")
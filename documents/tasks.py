@@ -4,12 +4,83 @@ Includes: chunked processing for long documents and schema suggestion.
 """
 
 import logging
+import random
+import threading
+import time
 
-from celery import shared_task
+from celery import group, shared_task
+from django.core.cache import cache
+from django.db import transaction
 from django.utils import timezone
 
+from .models import Document, ProcessingJob, SchemaSuggestion
+from .services import (
+    chunk_document,
+    pack_chunks,
+    process_document_chunked,
+    process_document_with_ai,
+    should_chunk,
+    suggest_schema_for_document,
+)
+
 logger = logging.getLogger(__name__)
 
+# Exponential backoff per attempt: 30s, 60s, 120s, ... capped. Jitter is
+# applied at use so workers don't stampede when a rate limit lifts.
+_PROCESS_BACKOFF = tuple(min(30 * (1 << i), 600) for i in range(11))
+_SUGGEST_BACKOFF = tuple(min(30 * (1 << i), 300) for i in range(4))
+
+
+class _ChunkBuffer:
+    """
+    Buffers per-chunk results and flushes them to the DB in batches.
+
+    Chunk callbacks arrive from multiple worker threads; writing every
+    single one is a hot DB path on large documents. Flush every
+    FLUSH_EVERY chunks or FLUSH_INTERVAL seconds, whichever first —
+    close() guarantees the final write.
+    """
+
+    FLUSH_EVERY = 5
+    FLUSH_INTERVAL = 5.0
+
+    def __init__(self, job_id: int):
+        self.job_id = job_id
+        self._pending: list[tuple[int, dict]] = []
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    def add(self, idx: int, payload: dict) -> None:
+        with self._lock:
+            self._pending.append((idx, payload))
+            if (
+                len(self._pending) >= self.FLUSH_EVERY
+                or time.monotonic() - self._last_flush >= self.FLUSH_INTERVAL
+            ):
+                self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        if self._pending:
+            ProcessingJob.record_chunks(self.job_id, self._pending)
+            self._pending = []
+        self._last_flush = time.monotonic()
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush_locked()
+
+
+def _patch_job(job_id: int, **fields) -> None:
+    """
+    Apply field changes to a job in one UPDATE.
+
+    Skips instance save() round-trips (and signal dispatch) — the task
+    never needs the refreshed row back.
+    """
+    ProcessingJob.objects.filter(pk=job_id).update(
+        updated_at=timezone.now(), **fields
+    )
+
 
 @shared_task(bind=True, max_retries=10)
 def process_document_task(self, job_id: int) -> dict:
@@ -18,97 +89,136 @@ def process_document_task(self, job_id: int) -> dict:
     Automatically uses chunked processing for large documents.
     Retries with exponential backoff on failure (rate limits, transient errors).
     """
-    from .models import ProcessingJob
-    from .services import (
-        process_document_with_ai,
-        process_document_chunked,
-        should_chunk,
-    )
+    # Claim the job under a row lock so a racing duplicate dispatch (e.g.
+    # a human retry against an in-flight execution) can't double-run the
+    # expensive LLM phase. The lock is held only for the state flip.
+    with transaction.atomic():
+        try:
+            job = (
+                ProcessingJob.objects.select_for_update(of=("self",), skip_locked=True)
+                .select_related("schema")
+                .only(
+                    "id",
+                    "status",
+                    "document_id",
+                    "schema__id",
+                    "schema__name",
+                    "schema__description",
+                    "schema__schema_definition",
+                    "schema__llm_provider",
+                    "schema__llm_model",
+                    "schema__updated_at",
+                )
+                .get(id=job_id)
+            )
+        except ProcessingJob.DoesNotExist:
+            if ProcessingJob.objects.filter(id=job_id).exists():
+                logger.info("Job %d is locked by another worker — skipping.", job_id)
+                return {"status": "skipped", "job_id": job_id}
+            logger.error("ProcessingJob %d does not exist.", job_id)
+            return {"status": "error", "message": f"Job {job_id} not found"}
 
-    try:
-        job = ProcessingJob.objects.select_related("document", "schema").get(id=job_id)
-    except ProcessingJob.DoesNotExist:
-        logger.error("ProcessingJob %d does not exist.", job_id)
-        return {"status": "error", "message": f"Job {job_id} not found"}
+        if job.status == "processing":
+            logger.info("Job %d is already processing — skipping duplicate.", job_id)
+            return {"status": "skipped", "job_id": job_id}
+
+        _patch_job(job_id, status="processing", celery_task_id=self.request.id or "")
 
-    job.status = "processing"
-    job.celery_task_id = self.request.id or ""
-    job.save(update_fields=["status", "celery_task_id", "updated_at"])
+    # Fetch the text only after the lock is released — raw_text can run to
+    # megabytes and doesn't belong in the locked claim window.
+    document_text, content_hash = Document.objects.values_list(
+        "raw_text", "content_hash"
+    ).get(pk=job.document_id)
+    # Read the schema once — schema_definition in particular is a JSONB
+    # column Django deserializes on access; keep one dict for the whole run.
+    schema = job.schema
+    schema_definition = schema.schema_definition
+
+    # Content-addressed result cache: identical (schema version, document
+    # text) pairs — duplicate uploads, re-runs — skip the LLM entirely.
+    if not content_hash:
+        content_hash = Document.hash_text(document_text)
+    result_key = (
+        f"extract:{schema.pk}:{schema.updated_at.timestamp():.0f}:{content_hash}"
+    )
+    cached_result = cache.get(result_key)
+    if cached_result is not None:
+        _patch_job(
+            job_id, result_data=cached_result, status="completed",
+            error_message="", completed_at=timezone.now(),
+        )
+        logger.info("Job %d served from the extraction result cache.", job_id)
+        return {"status": "completed", "job_id": job_id, "cached": True}
 
-    document_text = job.document.raw_text
     use_chunking = should_chunk(document_text)
+    total_chunks = 0
 
     try:
         if use_chunking:
-            # Chunked processing for long documents
-            from .services import chunk_document
-
-            chunks = chunk_document(document_text)
-            job.is_chunked = True
-            job.total_chunks = len(chunks)
-            job.processed_chunks = 0
-            job.save(update_fields=["is_chunked", "total_chunks", "processed_chunks", "updated_at"])
-
-            def on_chunk_complete(chunk_idx, total, accumulated):
-                """Update progress after each chunk."""
-                job.processed_chunks = chunk_idx + 1
-                job.chunk_results = accumulated
-                job.save(update_fields=["processed_chunks", "chunk_results", "updated_at"])
-
-            result = process_document_chunked(
-                document_text=document_text,
-                schema_name=job.schema.name,
-                schema_description=job.schema.description,
-                schema_definition=job.schema.schema_definition,
-                llm_provider=job.schema.llm_provider,
-                llm_model=job.schema.llm_model,
-                on_chunk_complete=on_chunk_complete,
+            # Chunked processing for long documents; count the packed
+            # batches — that's how many LLM calls will report progress.
+            chunks = pack_chunks(chunk_document(document_text))
+            total_chunks = len(chunks)
+            _patch_job(
+                job_id, is_chunked=True, total_chunks=total_chunks,
+                processed_chunks=0,
             )
+
+            chunk_buffer = _ChunkBuffer(job_id)
+
+            def on_chunk_complete(chunk_idx, total, chunk_result):
+                """Buffer this chunk's output; writes land in batches."""
+                chunk_buffer.add(chunk_idx, chunk_result)
+
+            try:
+                # Hand the already-packed batches to the service so the
+                # document isn't chunked (and tokenized) a second time.
+                result = process_document_chunked(
+                    document_text=document_text,
+                    schema_name=schema.name,
+                    schema_description=schema.description,
+                    schema_definition=schema_definition,
+                    llm_provider=schema.llm_provider,
+                    llm_model=schema.llm_model,
+                    on_chunk_complete=on_chunk_complete,
+                    chunks=chunks,
+                )
+            finally:
+                chunk_buffer.close()
         else:
             # Normal single-pass processing
             result = process_document_with_ai(
                 document_text=document_text,
-                schema_name=job.schema.name,
-                schema_description=job.schema.description,
-                schema_definition=job.schema.schema_definition,
-                llm_provider=job.schema.llm_provider,
-                llm_model=job.schema.llm_model,
+                schema_name=schema.name,
+                schema_description=schema.description,
+                schema_definition=schema_definition,
+                llm_provider=schema.llm_provider,
+                llm_model=schema.llm_model,
             )
 
-        job.result_data = result
-        job.status = "completed"
-        job.error_message = ""
-        job.completed_at = timezone.now()
-        job.save(
-            update_fields=[
-                "result_data",
-                "status",
-                "error_message",
-                "completed_at",
-                "updated_at",
-            ]
+        _patch_job(
+            job_id, result_data=result, status="completed", error_message="",
+            retry_count=self.request.retries, completed_at=timezone.now(),
         )
+        cache.set(result_key, result, timeout=30 * 86400)
 
         logger.info(
             "Job %d completed successfully%s.",
             job_id,
-            f" (chunked: {job.total_chunks} chunks)" if use_chunking else "",
+            f" (chunked: {total_chunks} chunks)" if use_chunking else "",
         )
         return {"status": "completed", "job_id": job_id}
 
     except Exception as exc:
-        job.retry_count = self.request.retries + 1
-        job.error_message = str(exc)
+        retry_count = self.request.retries + 1
 
         if self.request.retries < self.max_retries:
-            job.status = "retrying"
-            job.save(
-                update_fields=[
-                    "retry_count",
-                    "error_message",
-                    "status",
-                    "updated_at",
-                ]
+            # The status flip already costs one row UPDATE per attempt, so
+            # the attempt count and last error ride along in the same
+            # statement — pollers read them straight off the row.
+            _patch_job(
+                job_id, status="retrying", retry_count=retry_count,
+                error_message=str(exc),
             )
             logger.warning(
                 "Job %d failed (attempt %d/%d): %s — retrying...",
@@ -117,18 +227,12 @@ def process_document_task(self, job_id: int) -> dict:
                 self.max_retries,
                 exc,
             )
-            # Exponential backoff: 30s, 60s, 120s, ... up to 10 minutes
-            countdown = min(2**self.request.retries * 30, 600)
+            countdown = _PROCESS_BACKOFF[self.request.retries] * random.uniform(0.8, 1.2)
             raise self.retry(exc=exc, countdown=countdown)
         else:
-            job.status = "failed"
-            job.save(
-                update_fields=[
-                    "retry_count",
-                    "error_message",
-                    "status",
-                    "updated_at",
-                ]
+            _patch_job(
+                job_id, retry_count=retry_count, error_message=str(exc),
+                status="failed",
             )
             logger.error(
                 "Job %d failed permanently after %d retries: %s",
@@ -144,12 +248,17 @@ def suggest_schema_task(self, suggestion_id: int) -> dict:
     """
     AI agent analyzes a document and suggests an extraction schema.
     """
-    from .models import SchemaSuggestion
-    from .services import suggest_schema_for_document
-
     try:
-        suggestion = SchemaSuggestion.objects.select_related("document").get(
-            id=suggestion_id
+        suggestion = (
+            SchemaSuggestion.objects.select_related("document")
+            .only(
+                "id",
+                "status",
+                "llm_provider",
+                "llm_model",
+                "document__raw_text",
+            )
+            .get(id=suggestion_id)
         )
     except SchemaSuggestion.DoesNotExist:
         logger.error("SchemaSuggestion %d does not exist.", suggestion_id)
@@ -191,7 +300,7 @@ def suggest_schema_task(self, suggestion_id: int) -> dict:
             suggestion.status = "processing"
             suggestion.error_message = str(exc)
             suggestion.save(update_fields=["status", "error_message"])
-            countdown = min(2**self.request.retries * 30, 300)
+            countdown = _SUGGEST_BACKOFF[self.request.retries] * random.uniform(0.8, 1.2)
             raise self.retry(exc=exc, countdown=countdown)
         else:
             suggestion.status = "failed"
@@ -213,8 +322,15 @@ def process_batch_task(job_ids: list[int]) -> dict:
     Dispatch a batch of document processing tasks.
     Each job is processed independently — failures don't affect others.
     """
-    for job_id in job_ids:
-        process_document_task.delay(job_id)
+    # One group publish instead of N broker round-trips via .delay().
+    result = group(
+        process_document_task.s(job_id) for job_id in job_ids
+    ).apply_async()
 
-    logger.info("Dispatched %d processing tasks.", len(job_ids))
-    return {"status": "dispatched", "count": len(job_ids), "job_ids": job_ids}
+    logger.info("Dispatched %d processing tasks as group %s.", len(job_ids), result.id)
+    return {
+        "status": "dispatched",
+        "count": len(job_ids),
+        "job_ids": job_ids,
+        "group_id": result.id,
+    }
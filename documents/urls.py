@@ -1,60 +1,74 @@
-from django.urls import path
+from django.urls import include, path
 from . import views
 
-urlpatterns = [
-    # Dashboard
-    path("", views.dashboard, name="dashboard"),
-    # Schemas
-    path("schemas/", views.schema_index, name="schema-index"),
-    path("schemas/create/", views.schema_create, name="schema-create"),
-    path("schemas/<int:schema_id>/", views.schema_show, name="schema-show"),
-    path("schemas/<int:schema_id>/edit/", views.schema_edit, name="schema-edit"),
-    path("schemas/<int:schema_id>/delete/", views.schema_delete, name="schema-delete"),
-    # Documents
-    path("documents/", views.document_index, name="document-index"),
-    path("documents/upload/", views.document_upload, name="document-upload"),
-    path("documents/<int:document_id>/", views.document_show, name="document-show"),
+# Grouped by prefix so the resolver can discard whole groups on the first
+# path segment instead of walking one flat list.
+
+schema_urls = [
+    path("", views.schema_index, name="schema-index"),
+    path("create/", views.schema_create, name="schema-create"),
+    path("<int:schema_id>/", views.schema_show, name="schema-show"),
+    path("<int:schema_id>/edit/", views.schema_edit, name="schema-edit"),
+    path("<int:schema_id>/delete/", views.schema_delete, name="schema-delete"),
     path(
-        "documents/<int:document_id>/delete/",
+        "from-suggestion/<int:suggestion_id>/",
+        views.schema_create_from_suggestion,
+        name="schema-create-from-suggestion",
+    ),
+]
+
+document_urls = [
+    path("", views.document_index, name="document-index"),
+    path("upload/", views.document_upload, name="document-upload"),
+    path("<int:document_id>/", views.document_show, name="document-show"),
+    path(
+        "<int:document_id>/delete/",
         views.document_delete,
         name="document-delete",
     ),
     path(
-        "documents/<int:document_id>/export/text/",
+        "<int:document_id>/export/text/",
         views.export_document_text,
         name="export-document-text",
     ),
-    # Jobs
-    path("jobs/", views.job_index, name="job-index"),
-    path("jobs/<int:job_id>/retry/", views.job_retry, name="job-retry"),
-    path("jobs/<int:job_id>/export/json/", views.export_job_json, name="export-job-json"),
-    path("jobs/<int:job_id>/export/csv/", views.export_job_csv, name="export-job-csv"),
-    # Schema Suggestion
-    path(
-        "schemas/from-suggestion/<int:suggestion_id>/",
-        views.schema_create_from_suggestion,
-        name="schema-create-from-suggestion",
-    ),
-    # API
-    path("api/jobs/<int:job_id>/status/", views.api_job_status, name="api-job-status"),
+]
+
+job_urls = [
+    path("", views.job_index, name="job-index"),
+    path("<int:job_id>/retry/", views.job_retry, name="job-retry"),
+    path("<int:job_id>/export/json/", views.export_job_json, name="export-job-json"),
+    path("<int:job_id>/export/csv/", views.export_job_csv, name="export-job-csv"),
+]
+
+api_urls = [
+    path("jobs/<int:job_id>/status/", views.api_job_status, name="api-job-status"),
+    path("jobs/<int:job_id>/result/", views.api_job_result, name="api-job-result"),
     path(
-        "api/documents/<int:document_id>/suggest-schema/",
+        "documents/<int:document_id>/suggest-schema/",
         views.api_suggest_schema,
         name="api-suggest-schema",
     ),
     path(
-        "api/suggestions/<int:suggestion_id>/status/",
+        "suggestions/<int:suggestion_id>/status/",
         views.api_suggestion_status,
         name="api-suggestion-status",
     ),
     path(
-        "api/suggestions/<int:suggestion_id>/approve/",
+        "suggestions/<int:suggestion_id>/approve/",
         views.api_approve_suggestion,
         name="api-approve-suggestion",
     ),
     path(
-        "api/upload-and-suggest/",
+        "upload-and-suggest/",
         views.api_upload_and_suggest,
         name="api-upload-and-suggest",
     ),
 ]
+
+urlpatterns = [
+    path("", views.dashboard, name="dashboard"),
+    path("schemas/", include(schema_urls)),
+    path("documents/", include(document_urls)),
+    path("jobs/", include(job_urls)),
+    path("api/", include(api_urls)),
+]
@@ -2,33 +2,121 @@
 Inertia views for the document processing application.
 """
 
-import json
-
-from django.http import HttpResponse, JsonResponse
+import codecs
+
+import orjson
+from django.db.models import (
+    BooleanField,
+    Count,
+    ExpressionWrapper,
+    Func,
+    OuterRef,
+    Q,
+    Subquery,
+    TextField,
+)
+from django.db.models.functions import Length, Substr
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponse,
+    HttpResponseNotModified,
+)
 from django.shortcuts import redirect, get_object_or_404
+from django.utils import timezone
 from django.views.decorators.http import require_POST
 from inertia import render as inertia_render
 
-from .models import ExtractionSchema, Document, ProcessingJob, SchemaSuggestion
+from .models import (
+    ExtractionSchema,
+    Document,
+    ProcessingJob,
+    SchemaSuggestion,
+    approximate_count,
+)
 from .services import export_result_as_csv, get_available_providers, get_schema_presets
 from .tasks import process_document_task, process_batch_task, suggest_schema_task
 
+# Job statuses that count as "still running" for polling purposes.
+ACTIVE_STATUSES = ("pending", "processing", "retrying")
+
+# Largest inline text preview served with the document page.
+TEXT_PREVIEW_CHARS = 50_000
+
+# Maps characters that break (or abuse) Content-Disposition filenames to
+# underscores in one C-level pass.
+_FILENAME_TRANSLATE = str.maketrans(
+    {" ": "_", '"': "_", "\n": "_", "\r": "_", "/": "_", "\\": "_"}
+)
+
+
+def _decode_upload(f):
+    """
+    Decode an uploaded file to text chunk by chunk.
+
+    Avoids f.read() materializing the whole byte payload next to the
+    decoded string — large uploads stay on disk (Django's temp file)
+    and only stream through a 64 KB decode window. Rewinds the file so
+    it can still be saved as original_file.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    parts = [decoder.decode(chunk) for chunk in f.chunks()]
+    parts.append(decoder.decode(b"", final=True))
+    f.seek(0)
+    return "".join(parts)
+
+
+def _parse_body(request):
+    """
+    Parse the request payload once per request: orjson for JSON bodies
+    (2-3x faster than stdlib on large schema_definition payloads),
+    request.POST for form posts. The result is cached on the request so
+    repeated calls don't re-parse.
+    """
+    parsed = getattr(request, "_parsed_body", None)
+    if parsed is None:
+        parsed = (
+            orjson.loads(request.body)
+            if request.content_type == "application/json"
+            else request.POST
+        )
+        request._parsed_body = parsed
+    return parsed
+
+
+def _json_response(data, status=200):
+    """
+    JSON response encoded with orjson instead of DjangoJSONEncoder —
+    much faster on result_data-heavy payloads and on the polling
+    endpoints. Datetimes serialize natively as ISO-8601.
+    """
+    return HttpResponse(
+        orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS),
+        content_type="application/json",
+        status=status,
+    )
+
 
 # ──────────────────────────────── Dashboard ────────────────────────────────
 
 
 def dashboard(request):
-    schemas_count = ExtractionSchema.objects.count()
-    documents_count = Document.objects.count()
-    jobs_total = ProcessingJob.objects.count()
-    jobs_completed = ProcessingJob.objects.filter(status="completed").count()
-    jobs_failed = ProcessingJob.objects.filter(status="failed").count()
-    jobs_pending = ProcessingJob.objects.filter(
-        status__in=["pending", "processing", "retrying"]
-    ).count()
+    # Headline totals tolerate being approximate — read the planner
+    # estimate instead of scanning the tables. The job total stays exact
+    # because it rides along the conditional-aggregate scan below.
+    schemas_count = approximate_count(ExtractionSchema)
+    documents_count = approximate_count(Document)
+    # One conditional aggregate instead of four COUNT queries — the DB
+    # scans the jobs table once and buckets by status as it goes.
+    job_stats = ProcessingJob.objects.aggregate(
+        total=Count("id"),
+        completed=Count("id", filter=Q(status="completed")),
+        failed=Count("id", filter=Q(status="failed")),
+        pending=Count("id", filter=Q(status__in=["pending", "processing", "retrying"])),
+    )
 
     recent_jobs = list(
-        ProcessingJob.objects.select_related("document", "schema")
+        ProcessingJob.objects.for_list()
         .order_by("-created_at")[:10]
         .values(
             "id",
@@ -40,12 +128,6 @@ def dashboard(request):
             "completed_at",
         )
     )
-    # Serialize datetimes
-    for job in recent_jobs:
-        job["created_at"] = job["created_at"].isoformat() if job["created_at"] else None
-        job["completed_at"] = (
-            job["completed_at"].isoformat() if job["completed_at"] else None
-        )
 
     return inertia_render(
         request,
@@ -54,10 +136,10 @@ def dashboard(request):
             "stats": {
                 "schemas": schemas_count,
                 "documents": documents_count,
-                "jobsTotal": jobs_total,
-                "jobsCompleted": jobs_completed,
-                "jobsFailed": jobs_failed,
-                "jobsPending": jobs_pending,
+                "jobsTotal": job_stats["total"],
+                "jobsCompleted": job_stats["completed"],
+                "jobsFailed": job_stats["failed"],
+                "jobsPending": job_stats["pending"],
             },
             "recentJobs": recent_jobs,
         },
@@ -68,23 +150,26 @@ def dashboard(request):
 
 
 def schema_index(request):
+    # field_count is a stored generated column — select it instead of
+    # re-fetching every schema row just to read it (classic N+1).
     schemas = list(
         ExtractionSchema.objects.values(
-            "id", "name", "description", "llm_provider", "llm_model", "created_at"
+            "id",
+            "name",
+            "description",
+            "llm_provider",
+            "llm_model",
+            "field_count",
+            "created_at",
         )
     )
-    for s in schemas:
-        s["created_at"] = s["created_at"].isoformat() if s["created_at"] else None
-        # Get field count
-        obj = ExtractionSchema.objects.get(id=s["id"])
-        s["field_count"] = obj.field_count
 
     return inertia_render(request, "schemas/Index", props={"schemas": schemas})
 
 
 def schema_create(request):
     if request.method == "POST":
-        data = json.loads(request.body) if request.content_type == "application/json" else request.POST
+        data = _parse_body(request)
         errors = {}
 
         name = data.get("name", "").strip()
@@ -94,8 +179,8 @@ def schema_create(request):
         schema_definition = data.get("schema_definition", {})
         if isinstance(schema_definition, str):
             try:
-                schema_definition = json.loads(schema_definition)
-            except json.JSONDecodeError:
+                schema_definition = orjson.loads(schema_definition)
+            except orjson.JSONDecodeError:
                 errors["schema_definition"] = "Invalid JSON."
 
         if not schema_definition.get("fields"):
@@ -145,9 +230,6 @@ def schema_show(request, schema_id):
             "completed_at",
         )
     )
-    for j in jobs:
-        j["created_at"] = j["created_at"].isoformat() if j["created_at"] else None
-        j["completed_at"] = j["completed_at"].isoformat() if j["completed_at"] else None
 
     return inertia_render(
         request,
@@ -161,8 +243,8 @@ def schema_show(request, schema_id):
                 "llm_provider": schema.llm_provider,
                 "llm_model": schema.llm_model,
                 "field_count": schema.field_count,
-                "created_at": schema.created_at.isoformat(),
-                "updated_at": schema.updated_at.isoformat(),
+                "created_at": schema.created_at,
+                "updated_at": schema.updated_at,
             },
             "jobs": jobs,
         },
@@ -173,7 +255,7 @@ def schema_edit(request, schema_id):
     schema = get_object_or_404(ExtractionSchema, id=schema_id)
 
     if request.method == "POST":
-        data = json.loads(request.body) if request.content_type == "application/json" else request.POST
+        data = _parse_body(request)
         errors = {}
 
         name = data.get("name", "").strip()
@@ -183,8 +265,8 @@ def schema_edit(request, schema_id):
         schema_definition = data.get("schema_definition", {})
         if isinstance(schema_definition, str):
             try:
-                schema_definition = json.loads(schema_definition)
-            except json.JSONDecodeError:
+                schema_definition = orjson.loads(schema_definition)
+            except orjson.JSONDecodeError:
                 errors["schema_definition"] = "Invalid JSON."
 
         if not schema_definition.get("fields"):
@@ -244,19 +326,30 @@ def schema_delete(request, schema_id):
 
 
 def document_index(request):
+    # Attach each document's latest job via correlated subqueries — one
+    # SELECT for the whole page instead of one extra query per document.
+    latest_jobs = ProcessingJob.objects.filter(
+        document_id=OuterRef("id")
+    ).order_by("-created_at")
     documents = list(
-        Document.objects.values("id", "title", "file_type", "created_at")
+        Document.objects.annotate(
+            latest_status=Subquery(latest_jobs.values("status")[:1]),
+            latest_schema_name=Subquery(latest_jobs.values("schema__name")[:1]),
+        ).values(
+            "id",
+            "title",
+            "file_type",
+            "created_at",
+            "latest_status",
+            "latest_schema_name",
+        )
     )
     for d in documents:
-        d["created_at"] = d["created_at"].isoformat() if d["created_at"] else None
-        # Latest job info
-        latest_job = (
-            ProcessingJob.objects.filter(document_id=d["id"])
-            .order_by("-created_at")
-            .values("status", "schema__name")
-            .first()
+        status = d.pop("latest_status")
+        schema_name = d.pop("latest_schema_name")
+        d["latest_job"] = (
+            {"status": status, "schema__name": schema_name} if status else None
         )
-        d["latest_job"] = latest_job
 
     return inertia_render(
         request, "documents/Index", props={"documents": documents}
@@ -278,7 +371,9 @@ def document_upload(request):
                 },
             )
 
-        schema = get_object_or_404(ExtractionSchema, id=schema_id)
+        schema = ExtractionSchema.get_cached(schema_id)
+        if schema is None:
+            raise Http404("Schema not found.")
         files = request.FILES.getlist("files")
 
         if not files:
@@ -293,23 +388,30 @@ def document_upload(request):
                 },
             )
 
-        job_ids = []
+        # Two bulk INSERTs instead of two statements per file. FileField
+        # storage writes still happen per file (during pre_save), but the
+        # row round-trips are amortized.
+        docs = []
         for f in files:
-            content = f.read().decode("utf-8", errors="replace")
+            content = _decode_upload(f)
             ext = f.name.rsplit(".", 1)[-1].lower() if "." in f.name else "txt"
-
-            doc = Document.objects.create(
-                title=f.name,
-                raw_text=content,
-                original_file=f,
-                file_type=ext,
+            docs.append(
+                Document(
+                    title=f.name,
+                    raw_text=content,
+                    original_file=f,
+                    file_type=Document.normalize_file_type(ext),
+                    content_hash=Document.hash_text(content),
+                )
             )
-            job = ProcessingJob.objects.create(
-                document=doc,
-                schema=schema,
-                status="pending",
-            )
-            job_ids.append(job.id)
+        Document.objects.bulk_create(docs)
+        jobs = ProcessingJob.objects.bulk_create(
+            [
+                ProcessingJob(document=doc, schema=schema, status="pending")
+                for doc in docs
+            ]
+        )
+        job_ids = [job.id for job in jobs]
 
         # Dispatch batch processing
         process_batch_task.delay(job_ids)
@@ -324,16 +426,32 @@ def document_upload(request):
 
 
 def document_show(request, document_id):
-    document = get_object_or_404(Document, id=document_id)
+    # Slice the preview and measure the length in SQL — the full text
+    # column (potentially megabytes) never crosses the wire. The text
+    # export endpoint still serves the whole document.
+    document = get_object_or_404(
+        Document.objects.defer("raw_text").annotate(
+            text_preview=Substr("raw_text", 1, TEXT_PREVIEW_CHARS),
+            text_length=Length("raw_text"),
+        ),
+        id=document_id,
+    )
+    # result_data is the other heavy column: ship a has_result flag and
+    # let the page fetch the payload on demand via api_job_result.
     jobs = list(
         document.jobs.select_related("schema")
         .order_by("-created_at")
+        .annotate(
+            has_result=ExpressionWrapper(
+                Q(result_data__isnull=False), output_field=BooleanField()
+            )
+        )
         .values(
             "id",
             "schema__name",
             "schema__id",
             "status",
-            "result_data",
+            "has_result",
             "error_message",
             "retry_count",
             "is_chunked",
@@ -343,9 +461,6 @@ def document_show(request, document_id):
             "completed_at",
         )
     )
-    for j in jobs:
-        j["created_at"] = j["created_at"].isoformat() if j["created_at"] else None
-        j["completed_at"] = j["completed_at"].isoformat() if j["completed_at"] else None
 
     return inertia_render(
         request,
@@ -354,9 +469,10 @@ def document_show(request, document_id):
             "document": {
                 "id": document.id,
                 "title": document.title,
-                "raw_text": document.raw_text,
+                "raw_text": document.text_preview,
+                "raw_text_length": document.text_length,
                 "file_type": document.file_type,
-                "created_at": document.created_at.isoformat(),
+                "created_at": document.created_at,
             },
             "jobs": jobs,
             "providers": get_available_providers(),
@@ -375,8 +491,8 @@ def document_delete(request, document_id):
 
 
 def job_index(request):
-    jobs = list(
-        ProcessingJob.objects.select_related("document", "schema")
+    page = (
+        ProcessingJob.objects.for_list()
         .order_by("-created_at")
         .values(
             "id",
@@ -394,14 +510,21 @@ def job_index(request):
             "completed_at",
         )[:100]
     )
-    for j in jobs:
-        j["created_at"] = j["created_at"].isoformat() if j["created_at"] else None
-        j["updated_at"] = j["updated_at"].isoformat() if j["updated_at"] else None
-        j["completed_at"] = j["completed_at"].isoformat() if j["completed_at"] else None
-
-    has_active = ProcessingJob.objects.filter(
-        status__in=["pending", "processing", "retrying"]
-    ).exists()
+    # One pass over a server-side cursor: collect the page and classify
+    # active statuses as rows stream in, instead of materializing the
+    # list and rescanning it.
+    jobs = []
+    has_active = False
+    for j in page.iterator(chunk_size=100):
+        jobs.append(j)
+        if not has_active and j["status"] in ACTIVE_STATUSES:
+            has_active = True
+    # Fall back to a DB probe only when the page is full and none of it
+    # is active — an older pending/retrying job could sit beyond it.
+    if not has_active and len(jobs) == 100:
+        has_active = ProcessingJob.objects.filter(
+            status__in=ACTIVE_STATUSES
+        ).exists()
 
     return inertia_render(
         request,
@@ -412,12 +535,17 @@ def job_index(request):
 
 @require_POST
 def job_retry(request, job_id):
-    job = get_object_or_404(ProcessingJob, id=job_id)
-    job.status = "pending"
-    job.error_message = ""
-    job.retry_count = 0
-    job.save(update_fields=["status", "error_message", "retry_count", "updated_at"])
-    process_document_task.delay(job.id)
+    # Pure write — reset the row in one UPDATE instead of hydrating the
+    # model just to save it back, and 404 off the rowcount.
+    updated = ProcessingJob.objects.filter(pk=job_id).update(
+        status="pending",
+        error_message="",
+        retry_count=0,
+        updated_at=timezone.now(),
+    )
+    if not updated:
+        raise Http404("ProcessingJob not found.")
+    process_document_task.delay(job_id)
     return redirect("/jobs/")
 
 
@@ -425,12 +553,25 @@ def job_retry(request, job_id):
 
 
 def export_job_json(request, job_id):
-    job = get_object_or_404(ProcessingJob, id=job_id, status="completed")
-    response = HttpResponse(
-        json.dumps(job.result_data, indent=2, ensure_ascii=False),
-        content_type="application/json",
+    # result_data is already JSON in Postgres — let jsonb_pretty format
+    # it there and ship the text straight through, instead of
+    # deserializing the whole payload into Python dicts only to
+    # re-serialize them with indent=2.
+    row = (
+        ProcessingJob.objects.filter(id=job_id, status="completed")
+        .annotate(
+            pretty=Func(
+                "result_data", function="jsonb_pretty", output_field=TextField()
+            )
+        )
+        .values_list("pretty", "document__title")
+        .first()
     )
-    safe_title = job.document.title.replace(" ", "_")
+    if row is None:
+        raise Http404("No completed job matches the given query.")
+    pretty, title = row
+    response = HttpResponse(pretty or "null", content_type="application/json")
+    safe_title = title.translate(_FILENAME_TRANSLATE)
     response["Content-Disposition"] = f'attachment; filename="{safe_title}_result.json"'
     return response
 
@@ -439,15 +580,29 @@ def export_job_csv(request, job_id):
     job = get_object_or_404(ProcessingJob, id=job_id, status="completed")
     csv_content = export_result_as_csv(job.result_data)
     response = HttpResponse(csv_content, content_type="text/csv")
-    safe_title = job.document.title.replace(" ", "_")
+    safe_title = job.document.title.translate(_FILENAME_TRANSLATE)
     response["Content-Disposition"] = f'attachment; filename="{safe_title}_result.csv"'
     return response
 
 
 def export_document_text(request, document_id):
-    document = get_object_or_404(Document, id=document_id)
+    # raw_text is a straight decode of the uploaded file, so stream the
+    # file from disk when we have it — the response body never enters
+    # Python and the WSGI server can hand the file to the socket.
+    document = get_object_or_404(
+        Document.objects.defer("raw_text"), id=document_id
+    )
+    safe_title = document.title.translate(_FILENAME_TRANSLATE)
+    if document.original_file:
+        return FileResponse(
+            document.original_file.open("rb"),
+            as_attachment=True,
+            filename=f"{safe_title}.txt",
+            content_type="text/plain; charset=utf-8",
+        )
+    # Pasted/legacy documents without a stored file fall back to the
+    # TEXT column (fetched on demand because of the defer above).
     response = HttpResponse(document.raw_text, content_type="text/plain; charset=utf-8")
-    safe_title = document.title.replace(" ", "_")
     response["Content-Disposition"] = f'attachment; filename="{safe_title}.txt"'
     return response
 
@@ -457,21 +612,56 @@ def export_document_text(request, document_id):
 
 def api_job_status(request, job_id):
     """Simple JSON endpoint for polling job status from the frontend."""
-    job = get_object_or_404(ProcessingJob, id=job_id)
-    return JsonResponse(
-        {
-            "id": job.id,
-            "status": job.status,
-            "retry_count": job.retry_count,
-            "error_message": job.error_message,
-            "completed_at": job.completed_at.isoformat() if job.completed_at else None,
-            "has_result": job.result_data is not None,
-            # Chunk progress
-            "is_chunked": job.is_chunked,
-            "total_chunks": job.total_chunks,
-            "processed_chunks": job.processed_chunks,
-        }
+    job = get_object_or_404(
+        ProcessingJob.objects.only(
+            "id",
+            "status",
+            "retry_count",
+            "error_message",
+            "completed_at",
+            "result_data",
+            "is_chunked",
+            "total_chunks",
+            "processed_chunks",
+            "updated_at",
+        ),
+        id=job_id,
+    )
+    # Polled every second per active job, and between chunk flushes the
+    # row doesn't change — revalidate against updated_at and answer 304
+    # with an empty body when nothing moved.
+    etag = f'W/"{job.updated_at.timestamp():.6f}"'
+    if request.headers.get("If-None-Match") == etag:
+        return HttpResponseNotModified()
+    payload = {
+        "id": job.id,
+        "status": job.status,
+        "retry_count": job.retry_count,
+        "error_message": job.error_message,
+        "completed_at": job.completed_at,
+        "has_result": job.result_data is not None,
+        # Chunk progress
+        "is_chunked": job.is_chunked,
+        "total_chunks": job.total_chunks,
+        "processed_chunks": job.processed_chunks,
+    }
+    response = _json_response(payload)
+    response["ETag"] = etag
+    # Force revalidation so the browser serves its cached copy on 304.
+    response["Cache-Control"] = "no-cache"
+    return response
+
+
+def api_job_result(request, job_id):
+    """On-demand result payload — kept out of the document page props."""
+    result_data = (
+        ProcessingJob.objects.filter(id=job_id, status="completed")
+        .values_list("result_data", flat=True)
+        .first()
     )
+    if result_data is None:
+        raise Http404("No completed result for this job.")
+    return _json_response({"job_id": job_id, "result_data": result_data})
 
 
 # ──────────────────────────── Schema Suggestion ────────────────────────────
@@ -486,7 +676,7 @@ def api_suggest_schema(request, document_id):
     """
     document = get_object_or_404(Document, id=document_id)
 
-    data = json.loads(request.body) if request.content_type == "application/json" else request.POST
+    data = _parse_body(request)
     providers = get_available_providers()
     default_provider = providers[0]["value"] if providers else "openai"
     default_model = providers[0]["models"][0] if providers else "gpt-4o"
@@ -500,7 +690,7 @@ def api_suggest_schema(request, document_id):
 
     suggest_schema_task.delay(suggestion.id)
 
-    return JsonResponse(
+    return _json_response(
         {
             "suggestion_id": suggestion.id,
             "status": "pending",
@@ -516,9 +706,7 @@ def api_suggestion_status(request, suggestion_id):
         "id": suggestion.id,
         "status": suggestion.status,
         "error_message": suggestion.error_message,
-        "completed_at": (
-            suggestion.completed_at.isoformat() if suggestion.completed_at else None
-        ),
+        "completed_at": suggestion.completed_at,
     }
 
     if suggestion.status == "completed":
@@ -530,7 +718,7 @@ def api_suggestion_status(request, suggestion_id):
             }
         )
 
-    return JsonResponse(response_data)
+    return _json_response(response_data)
 
 
 def schema_create_from_suggestion(request, suggestion_id):
@@ -571,11 +759,7 @@ def api_approve_suggestion(request, suggestion_id):
         SchemaSuggestion, id=suggestion_id, status="completed"
     )
 
-    data = (
-        json.loads(request.body)
-        if request.content_type == "application/json"
-        else {}
-    )
+    data = _parse_body(request)
 
     # Allow the user to override name/description from the frontend
     schema_name = data.get("name", suggestion.suggested_name) or suggestion.suggested_name
@@ -598,7 +782,7 @@ def api_approve_suggestion(request, suggestion_id):
 
     process_document_task.delay(job.id)
 
-    return JsonResponse(
+    return _json_response(
         {
             "schema_id": schema.id,
             "job_id": job.id,
@@ -622,11 +806,11 @@ def api_upload_and_suggest(request):
     """
     uploaded_file = request.FILES.get("file")
     if not uploaded_file:
-        return JsonResponse({"error": "No file provided."}, status=400)
+        return _json_response({"error": "No file provided."}, status=400)
 
-    content = uploaded_file.read().decode("utf-8", errors="replace")
+    content = _decode_upload(uploaded_file)
     if not content.strip():
-        return JsonResponse({"error": "File is empty."}, status=400)
+        return _json_response({"error": "File is empty."}, status=400)
 
     ext = (
         uploaded_file.name.rsplit(".", 1)[-1].lower()
@@ -634,13 +818,12 @@ def api_upload_and_suggest(request):
         else "txt"
     )
 
-    # Save the document
-    uploaded_file.seek(0)
     doc = Document.objects.create(
         title=uploaded_file.name,
         raw_text=content,
         original_file=uploaded_file,
-        file_type=ext,
+        file_type=Document.normalize_file_type(ext),
+        content_hash=Document.hash_text(content),
     )
 
     providers = get_available_providers()
@@ -656,7 +839,7 @@ def api_upload_and_suggest(request):
 
     suggest_schema_task.delay(suggestion.id)
 
-    return JsonResponse(
+    return _json_response(
         {
             "suggestion_id": suggestion.id,
             "document_id": doc.id,
@@ -37,6 +37,36 @@ export default function DocumentShow({ document, jobs, providers }: Props) {
   const [activeJobIndex, setActiveJobIndex] = useState(0);
   const activeJob = jobs[activeJobIndex] || null;
 
+  // Result payloads are fetched on demand (the jobs list only carries a
+  // has_result flag) and cached per job id.
+  const [jobResults, setJobResults] = useState<
+    Record<number, Record<string, unknown>>
+  >({});
+  const activeResult = activeJob ? jobResults[activeJob.id] : undefined;
+
+  useEffect(() => {
+    if (!activeJob || !activeJob.has_result || jobResults[activeJob.id]) {
+      return;
+    }
+    let cancelled = false;
+    fetch(`/api/jobs/${activeJob.id}/result/`)
+      .then((res) => (res.ok ? res.json() : null))
+      .then((data) => {
+        if (!cancelled && data?.result_data) {
+          setJobResults((prev) => ({
+            ...prev,
+            [activeJob.id]: data.result_data,
+          }));
+        }
+      })
+      .catch(() => {
+        // Transient fetch errors leave the panel in its loading state.
+      });
+    return () => {
+      cancelled = true;
+    };
+  }, [activeJob, jobResults]);
+
   // ─── Suggestion state ───
   const [llmProvider, setLlmProvider] = useState(
     providers[0]?.value || "openai"
@@ -455,7 +485,10 @@ export default function DocumentShow({ document, jobs, providers }: Props) {
             <div className="p-4 border-b flex items-center justify-between">
               <h2 className="font-semibold">Document Text</h2>
               <span className="text-xs text-muted-foreground">
-                {document.raw_text.length.toLocaleString()} chars
+                {(document.raw_text_length ?? document.raw_text.length).toLocaleString()}{" "}
+                chars
+                {(document.raw_text_length ?? 0) > document.raw_text.length &&
+                  " (preview truncated)"}
               </span>
             </div>
             <div className="p-4 max-h-[600px] overflow-y-auto">
@@ -469,7 +502,7 @@ export default function DocumentShow({ document, jobs, providers }: Props) {
           <div className="rounded-lg border bg-card shadow-sm">
             <div className="p-4 border-b flex items-center justify-between">
               <h2 className="font-semibold">Extracted Data</h2>
-              {activeJob?.status === "completed" && activeJob.result_data && (
+              {activeJob?.status === "completed" && activeJob.has_result && (
                 <div className="flex items-center gap-2">
                   <a
                     href={`/jobs/${activeJob.id}/export/json/`}
@@ -495,8 +528,12 @@ export default function DocumentShow({ document, jobs, providers }: Props) {
                 <p className="text-sm text-muted-foreground">
                   No processing jobs for this document.
                 </p>
-              ) : activeJob.status === "completed" && activeJob.result_data ? (
-                <JsonViewer data={activeJob.result_data} initialExpandDepth={2} />
+              ) : activeJob.status === "completed" && activeResult ? (
+                <JsonViewer data={activeResult} initialExpandDepth={2} />
+              ) : activeJob.status === "completed" && activeJob.has_result ? (
+                <div className="flex items-center justify-center py-8">
+                  <Loader2 className="h-5 w-5 animate-spin text-muted-foreground" />
+                </div>
               ) : activeJob.status === "failed" ? (
                 <div className="space-y-2">
                   <StatusBadge status="failed" />
@@ -41,6 +41,8 @@ export interface Document {
   id: number;
   title: string;
   raw_text: string;
+  /** Full text length; raw_text may be a truncated preview. */
+  raw_text_length?: number;
   file_type: string;
   created_at: string;
   latest_job?: {
@@ -66,6 +68,8 @@ export interface ProcessingJob {
   schema__id?: number;
   status: JobStatus;
   result_data?: Record<string, unknown> | null;
+  /** Set by list endpoints that omit result_data; fetch it on demand. */
+  has_result?: boolean;
   error_message: string;
   retry_count: number;
   created_at: string;